@@ -1,129 +1,731 @@
-from utils import input_string_generator, alpha
+from utils import (DEFAULT_MODEL, align_trimmed, DIAG, UP, LEFT,
+                   packed_row_size, pack_row, pack_row_array,
+                   traceback_packed)
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from efficient import score
+from instrument import count_cells
+import cli
+import argparse
+import hashlib
 import os
-import sys
-import time
+import zlib
 
 
-# check if psutil installed for memory measurement
+# check if numpy installed for the vectorized engine
 try:
-    import psutil
-    _HAS_PSUTIL = True
-except:
-    _HAS_PSUTIL = False
-    import resource
+    import numpy as np
+    _HAS_NUMPY = True
+except ImportError:
+    _HAS_NUMPY = False
 
 
-delta = 30  # Gap penalty
-
-def align_sequences(seq1, seq2):
+def align_sequences(seq1, seq2, model=DEFAULT_MODEL):
     # Example alignment logic (to be implemented)
     m, n = len(seq1), len(seq2)
+    delta = model.gap
 
-    dp = [[0 for _ in range(n + 1)] for _ in range(m + 1)]
+    # encode once; profile[c][j-1] is the cost of c against seq2[j-1]
+    codes1 = model.encode(seq1)
+    profile = model.query_profile(model.encode(seq2))
 
-    # backtracking table (0 diag, 1 up, 2 left)
-    bt = [[-1 for _ in range(n + 1)] for _ in range(m + 1)]
+    count_cells(m * n)
 
-    # Base Cases
-    for i in range(m + 1):
-        dp[i][0] = i * delta
-        if i>0:
-            bt[i][0] = 1  # from up
+    # backtracking table (0 diag, 1 up, 2 left), packed 2 bits per cell;
+    # only two rows of costs are kept
+    stride = packed_row_size(n)
+    bt = bytearray(stride * (m + 1))
 
-    for j in range(n + 1):
-        dp[0][j] = j * delta
-        if j>0:
-            bt[0][j] = 2  # from left
+    # Base Cases
+    prev = [j * delta for j in range(n + 1)]
+    bt[0:stride] = pack_row([DIAG] + [LEFT] * n)  # from left
 
     for i in range(1, m + 1):
+        costs = profile[codes1[i-1]]
+        curr = [0] * (n + 1)
+        dirs = [0] * (n + 1)
+        curr[0] = i * delta
+        dirs[0] = UP  # from up
+
         for j in range(1, n + 1):
                 
-            diag = dp[i-1][j-1] + alpha(seq1[i-1], seq2[j-1])
-            up = dp[i-1][j] + delta
-            left = dp[i][j-1] + delta
+            diag = prev[j-1] + costs[j-1]
+            up = prev[j] + delta
+            left = curr[j-1] + delta
                 
             # deterministic tie-breaking: diag, up, left
             # to preserve directions
 
             best = diag
-            bt_dir = 0
+            bt_dir = DIAG
             if up < best:
                 best = up
-                bt_dir = 1
+                bt_dir = UP
             if left < best:
                 best = left
-                bt_dir = 2
+                bt_dir = LEFT
+
+            curr[j] = best
+            dirs[j] = bt_dir
 
-            dp[i][j] = best
-            bt[i][j] = bt_dir
+        bt[i*stride:(i+1)*stride] = pack_row(dirs)
+        prev = curr
 
     # backtrack
-    aligned_seq1 = ""
-    aligned_seq2 = ""
-    i, j = m, n
-
-    while i>0 or j>0:
-        if i>0 and j>0 and bt[i][j] == 0:
-            aligned_seq1 = seq1[i-1] + aligned_seq1
-            aligned_seq2 = seq2[j-1] + aligned_seq2
-            i -= 1
-            j -= 1
-        elif i>0 and (j==0 or bt[i][j]==1):
-            aligned_seq1 = seq1[i-1] + aligned_seq1
-            aligned_seq2 = "_" + aligned_seq2
-            i -= 1
-        else:
-            aligned_seq1 = "_" + aligned_seq1
-            aligned_seq2 = seq2[j-1] + aligned_seq2
-            j -= 1
-
-    return dp[m][n], aligned_seq1, aligned_seq2
+    script = traceback_packed(bt, seq1, seq2)
 
+    return prev[n], script
 
-def main():
-    
-    if len(sys.argv) != 3:
-        sys.exit(1)
 
-    input_file = sys.argv[1]
-    output_file = sys.argv[2]
+def align_sequences_numpy(seq1, seq2, model=DEFAULT_MODEL):
+    # Same recurrence as align_sequences, but every anti-diagonal i+j=d is
+    # filled with one vectorized step. A cell on diagonal d only depends on
+    # diagonals d-1 and d-2, so the costs live in three rolling buffers
+    # indexed by i; only the backtracking table is kept in full.
+    m, n = len(seq1), len(seq2)
+    delta = model.gap
+
+    if m == 0 or n == 0:
+        return align_sequences(seq1, seq2, model)
+
+    count_cells(m * n)
+
+    sub = model.matrix_array
+    a = model.encode_array(seq1)
+    b_rev = model.encode_array(seq2)[::-1]
+
+    # backtracking table (0 diag, 1 up, 2 left), packed 2 bits per cell
+    bt = np.zeros((m + 1, packed_row_size(n)), dtype=np.uint8)
+    bt[0] = pack_row_array(np.full(n + 1, LEFT, dtype=np.uint8))
+    bt[1:, 0] |= UP
+
+    prev2 = np.zeros(m + 1, dtype=np.int64)  # diagonal d-2
+    prev = np.zeros(m + 1, dtype=np.int64)   # diagonal d-1
+    curr = np.zeros(m + 1, dtype=np.int64)   # diagonal d
+
+    for d in range(1, m + n + 1):
+        # base cases on this diagonal: cells (0, d) and (d, 0)
+        if d <= n:
+            curr[0] = d * delta
+        if d <= m:
+            curr[d] = d * delta
+
+        # interior cells (i, d-i) with 1 <= i <= m and 1 <= d-i <= n
+        lo = max(1, d - n)
+        hi = min(m, d - 1)
+
+        if lo <= hi:
+            # seq2[j-1] for j = d-i runs backwards as i grows, which is a
+            # forward slice of the reversed sequence
+            costs = sub[a[lo-1:hi], b_rev[n-d+lo:n-d+hi+1]]
+
+            diag = prev2[lo-1:hi] + costs
+            up = prev[lo-1:hi] + delta
+            left = prev[lo:hi+1] + delta
+
+            # deterministic tie-breaking: diag, up, left
+            best = diag
+            bt_dir = np.zeros(hi - lo + 1, dtype=np.uint8)
+            mask = up < best
+            best = np.where(mask, up, best)
+            bt_dir[mask] = UP
+            mask = left < best
+            best = np.where(mask, left, best)
+            bt_dir[mask] = LEFT
+
+            curr[lo:hi+1] = best
+
+            # each cell of a diagonal is in a different row, so the packed
+            # bytes written here are all distinct
+            rows = np.arange(lo, hi + 1)
+            cols = d - rows
+            bt[rows, cols >> 2] |= bt_dir << ((cols & 3) << 1).astype(np.uint8)
+
+        prev2, prev, curr = prev, curr, prev2
+
+    # backtrack
+    script = traceback_packed(memoryview(bt.reshape(-1)), seq1, seq2)
+
+    return int(prev[m]), script
+
+
+# starting half-width of the band in align_sequences_banded
+BAND_START = 16
+
+# cost of a cell outside the band; adding a few gap costs to it can't overflow
+_BAND_INF = 1 << 60
+
+
+def align_sequences_banded(seq1, seq2, band=BAND_START, model=DEFAULT_MODEL):
+    # Exact alignment that only fills the diagonal band
+    #     min(0, n-m) - k <= j - i <= max(0, n-m) + k.
+    # A path that leaves the band needs at least |n-m| + 2(k+1) gaps, so
+    # when the best in-band cost is below delta times that, every optimal
+    # path stays in the band and the banded traceback is exactly the
+    # full-table one. Otherwise the half-width k doubles and the band is
+    # refilled. Work is O(m*k) for a pair at distance ~k. The bound needs
+    # nonnegative substitution costs, which ScoringModel guarantees.
+    m, n = len(seq1), len(seq2)
+    delta = model.gap
+    k = max(1, band)
+
+    while True:
+        lo = min(0, n - m) - k
+        hi = max(0, n - m) + k
+        if lo <= -m and hi >= n:
+            # the band covers the whole table, nothing left to prove
+            return _fill_band(seq1, seq2, -m, n, model)
+
+        result = _fill_band(seq1, seq2, lo, hi, model)
+        if result[0] < delta * (abs(n - m) + 2 * (k + 1)):
+            return result
+        k *= 2
+
+
+def _fill_band(seq1, seq2, lo, hi, model):
+    # Fills the cells with lo <= j - i <= hi row by row. Row i is stored by
+    # band position t = j - i - lo, so diag, up and left of a cell are at
+    # t, t+1 and t-1 of the previous / current row.
+    m, n = len(seq1), len(seq2)
+    delta = model.gap
+    w = hi - lo + 1
+    count_cells(m * w)
+
+    codes1 = model.encode(seq1)
+    # profile[c][j] is the cost of c against seq2[j-1]
+    profile = np.zeros((len(model.alphabet), n + 1), dtype=np.int64)
+    profile[:, 1:] = model.query_profile_array(model.encode_array(seq2))
+    ramp = np.arange(w, dtype=np.int64) * delta
+
+    # backtracking table (0 diag, 1 up, 2 left), packed 2 bits per cell
+    bt = np.zeros((m + 1, packed_row_size(w - 1)), dtype=np.uint8)
+
+    # one spare INF slot at the end so that up can always read t+1
+    prev = np.full(w + 1, _BAND_INF, dtype=np.int64)
+    curr = np.full(w + 1, _BAND_INF, dtype=np.int64)
+    dirs = np.full(w, LEFT, dtype=np.uint8)
+
+    # row 0: cells (0, j) for j = lo+t in [0, n]
+    tl, th = max(0, -lo), min(w - 1, n - lo)
+    prev[tl:th+1] = (lo + np.arange(tl, th + 1)) * delta
+    bt[0] = pack_row_array(dirs)
+
+    for i in range(1, m + 1):
+        base = i + lo  # j of band position 0
+        tl, th = max(0, -base), min(w - 1, n - base)
+
+        curr.fill(_BAND_INF)
+        dirs.fill(LEFT)
+
+        t0 = tl
+        if base + tl == 0:
+            # column 0 is in the band
+            curr[tl] = i * delta
+            dirs[tl] = UP
+            t0 = tl + 1
+
+        if t0 <= th:
+            diag = prev[t0:th+1] + profile[codes1[i-1], base+t0:base+th+1]
+            up = prev[t0+1:th+2] + delta
+            np.minimum(diag, up, out=curr[t0:th+1])
+
+            # left: running minimum of curr[t] - t*delta over the row
+            seg = curr[tl:th+1]
+            seg -= ramp[:th-tl+1]
+            np.minimum.accumulate(seg, out=seg)
+            seg += ramp[:th-tl+1]
+
+            # deterministic tie-breaking: diag, up, left
+            row = curr[t0:th+1]
+            d = dirs[t0:th+1]
+            d[up == row] = UP
+            d[diag == row] = DIAG
+
+        bt[i] = pack_row_array(dirs)
+        prev, curr = curr, prev
+
+    script = traceback_packed(memoryview(bt.reshape(-1)), seq1, seq2,
+                              band_lo=lo, band_width=w)
+
+    return int(prev[n - m - lo]), script
+
+
+# Four-Russians engine: block size (a multiple of 4, so that blocks own
+# whole bytes of the packed direction rows), where the block table is
+# cached, and how many blocks it may hold. An entry takes about 300 bytes
+# in memory at t = 4 (dict slot included), so the cap keeps the table
+# around 20 MB; random pairs hardly ever repeat a block anyway.
+FOUR_RUSSIANS_T = 4
+FOUR_RUSSIANS_CACHE = os.path.join(os.path.expanduser("~"), ".cache",
+                                   "csci570_alignment")
+FOUR_RUSSIANS_MAX_BLOCKS = 1 << 16
+
+
+def align_sequences_four_russians(seq1, seq2, t=FOUR_RUSSIANS_T,
+                                  cache_dir=FOUR_RUSSIANS_CACHE,
+                                  model=DEFAULT_MODEL):
+    # Four-Russians style engine. With nonnegative substitution costs,
+    # adjacent cells differ by at most delta, so a t x t block is fully
+    # described by its t characters of each sequence and the cost
+    # differences along its top row and left column. Its outputs
+    # (differences along its bottom row and right column, plus its
+    # directions, which are shift invariant) are looked up in a table keyed
+    # by those inputs. The full table would have
+    # |alphabet|^(2t) * (2*delta+1)^(2t) entries, so it is filled lazily
+    # with the blocks the inputs actually produce and kept on disk per
+    # scoring model. Keys and outputs are byte strings (see _fill_block),
+    # only the boundary differences of the current strip are kept between
+    # blocks, and the directions go straight into one packed table.
+    m, n = len(seq1), len(seq2)
+    delta = model.gap
+
+    if t < 4 or t > 252 or t % 4:
+        raise ValueError("block size must be a multiple of 4 up to 252")
+
+    wide = 2 * delta > 255
+    size = 4 if wide else 1
+    table, path = _load_block_table(t, cache_dir, model)
+    added = []
+
+    a = model.encode(seq1)
+    b = model.encode(seq2)
+    y_blocks = [b[c:c+t] for c in range(0, n, t)]
+    # keys are h, x symbols, w, y symbols, top and left differences
+    y_keys = [bytes((len(yb),)) + yb for yb in y_blocks]
+    q = t // 4
+
+    # backtracking table (0 diag, 1 up, 2 left), packed 2 bits per cell
+    stride = packed_row_size(n)
+    bt = bytearray(stride * (m + 1))
+    bt[0:stride] = pack_row([DIAG] + [LEFT] * n)
+
+    # differences along the bottom row of the previous strip, per block
+    tops = [_pack_diffs([delta] * len(yb), delta, wide) for yb in y_blocks]
+
+    for r in range(0, m, t):
+        xb = a[r:r+t]
+        h = len(xb)
+        x_key = bytes((h,)) + xb
+        left = _pack_diffs([delta] * h, delta, wide)
+        # direction of the last column of the previous block, per row;
+        # column 0 points up
+        last = bytes([UP]) * h
+
+        for k, yb in enumerate(y_blocks):
+            w = len(yb)
+            key = x_key + y_keys[k] + tops[k] + left
+            out = table.get(key)
+            if out is None:
+                out = _fill_block(xb, yb, tops[k], left, t, model.matrix,
+                                  delta, wide)
+                if len(table) < FOUR_RUSSIANS_MAX_BLOCKS:
+                    table[key] = out
+                    added.append(key)
+
+            # out is bottom, right, own directions, last-column directions
+            qb = q if w == t else (w + 4) // 4
+            o1 = w * size
+            o2 = o1 + h * size
+            o3 = o2 + h * qb
+            tops[k] = out[:o1]
+            left = out[o1:o2]
+
+            # the block owns the bytes of its columns +0..; column +0
+            # belongs to the previous block
+            pos = (r + 1) * stride + k * q
+            if qb == 1:
+                # one byte per row: all rows with one strided assignment
+                own = (int.from_bytes(out[o2:o3], "little")
+                       | int.from_bytes(last, "little"))
+                bt[pos:pos + (h-1)*stride + 1:stride] = own.to_bytes(h, "little")
+            else:
+                for rr in range(h):
+                    bt[pos:pos+qb] = out[o2 + rr*qb:o2 + (rr+1)*qb]
+                    bt[pos] |= last[rr]
+                    pos += stride
+            last = out[o3:o3 + h]
+
+        if n % t == 0 and n:
+            # the last column of the table starts a byte of its own
+            pos = (r + 1) * stride + n // 4
+            for rr in range(h):
+                bt[pos] = last[rr]
+                pos += stride
+
+    if added:
+        _save_blocks([key + table[key] for key in added], path)
+
+    # dp[m][n] = dp[m][0] + sum of the differences along the last row
+    cost = m * delta + sum(sum(_unpack_diffs(top, delta, wide)) for top in tops)
+
+    # backtrack
+    script = traceback_packed(bt, seq1, seq2)
+
+    return cost, script
 
+
+def _pack_diffs(diffs, delta, wide):
+    # differences in [-delta, delta] as bytes, 4 per difference if wide
+    if wide:
+        return array("I", [d + delta for d in diffs]).tobytes()
+    return bytes([d + delta for d in diffs])
+
+
+def _unpack_diffs(data, delta, wide):
+    return [v - delta for v in _diff_view(data, wide)]
+
+
+def _diff_view(data, wide):
+    # indexable view of packed differences, each still offset by delta
+    return memoryview(data).cast("I") if wide else data
+
+
+def _fill_block(xb, yb, top, left, t, matrix, delta, wide):
+    # Fills one block from its boundary differences. Values are relative
+    # to the top-left corner, which doesn't change any comparison. Returns
+    # one byte string: the bottom and right differences, then per row the
+    # packed directions of columns +0..+t-1 (column +0 left zero, for the
+    # previous block) and the direction of column +t of every row (for the
+    # next block; a narrower last block has all its columns in the first).
+    r, c = len(xb), len(yb)
+    count_cells(r * c)
+    q = t // 4 if c == t else (c + 4) // 4
+    top = _diff_view(top, wide)
+    left = _diff_view(left, wide)
+
+    prev = [0] * (c + 1)
+    for j in range(1, c + 1):
+        prev[j] = prev[j-1] + top[j-1] - delta
+
+    right = []
+    own = bytearray()
+    last = bytearray(r)
+
+    for i in range(r):
+        costs = matrix[xb[i]]
+        curr = [0] * (c + 1)
+        curr[0] = prev[0] + left[i] - delta
+        # directions of the row, packed: column j in bits 2j, 2j+1
+        bits = 0
+
+        for j in range(1, c + 1):
+            diag = prev[j-1] + costs[yb[j-1]]
+            up = prev[j] + delta
+            left_ = curr[j-1] + delta
+
+            # deterministic tie-breaking: diag, up, left
+            best = diag
+            bt_dir = DIAG
+            if up < best:
+                best = up
+                bt_dir = UP
+            if left_ < best:
+                best = left_
+                bt_dir = LEFT
+
+            curr[j] = best
+            bits |= bt_dir << (j << 1)
+
+        if c == t:
+            last[i] = bits >> (c << 1)
+            bits &= (1 << (c << 1)) - 1
+        own += bits.to_bytes(q, "little")
+        right.append(curr[c] - prev[c])
+        prev = curr
+
+    bottom = [prev[j] - prev[j-1] for j in range(1, c + 1)]
+
+    return (_pack_diffs(bottom, delta, wide) + _pack_diffs(right, delta, wide)
+            + bytes(own) + bytes(last))
+
+
+# The block table file is a sequence of frames, one per run that added
+# blocks: magic, payload length and CRC-32 of the payload (both 4 bytes,
+# little endian), then the payload, key + output records back to back.
+# A frame torn by a writer that died or by a short write fails its check
+# and is skipped up to the next magic.
+_BLOCK_FRAME_MAGIC = b"\xf4\x52"
+_BLOCK_FRAME_HEADER = len(_BLOCK_FRAME_MAGIC) + 8
+
+
+def _load_block_table(t, cache_dir, model):
+    # one table file per block size and scoring model
+    scheme = repr((3, t, model.key())).encode()
+    name = "four_russians_" + hashlib.sha1(scheme).hexdigest()[:16] + ".bin"
+    path = os.path.join(cache_dir, name)
+    size = 4 if 2 * model.gap > 255 else 1
+
+    table = {}
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return table, path
+
+    pos = data.find(_BLOCK_FRAME_MAGIC)
+    while pos >= 0 and len(table) < FOUR_RUSSIANS_MAX_BLOCKS:
+        start = pos + _BLOCK_FRAME_HEADER
+        length = int.from_bytes(data[start-8:start-4], "little")
+        crc = int.from_bytes(data[start-4:start], "little")
+        payload = data[start:start+length]
+        records = None
+        if (start <= len(data) and len(payload) == length
+                and zlib.crc32(payload) == crc):
+            records = _parse_blocks(payload, t, size)
+        if records is None:
+            pos = data.find(_BLOCK_FRAME_MAGIC, pos + 1)
+            continue
+        for key, out in records:
+            if len(table) >= FOUR_RUSSIANS_MAX_BLOCKS:
+                break
+            table[key] = out
+        pos = data.find(_BLOCK_FRAME_MAGIC, start + length)
+    return table, path
+
+
+def _parse_blocks(payload, t, size):
+    # splits a frame payload into (key, output) pairs; their lengths follow
+    # from the block shape h, w stored in the key. None if they don't add
+    # up to the payload.
+    records = []
+    pos = 0
+    while pos < len(payload):
+        h = payload[pos]
+        if pos + h + 1 >= len(payload):
+            return None
+        w = payload[pos + h + 1]
+        qb = t // 4 if w == t else (w + 4) // 4
+        key_len = 2 + (h + w) * (1 + size)
+        out_len = (h + w) * size + h * qb + h
+        if pos + key_len + out_len > len(payload):
+            return None
+        records.append((payload[pos:pos+key_len],
+                        payload[pos+key_len:pos+key_len+out_len]))
+        pos += key_len + out_len
+    return records
+
+
+def _save_blocks(records, path):
+    # Appends the new blocks as one frame. Other processes may append to
+    # the same file at the same time; O_APPEND keeps each write in one
+    # piece, and a frame torn anyway is skipped by the loader.
+    payload = b"".join(records)
+    frame = (_BLOCK_FRAME_MAGIC + len(payload).to_bytes(4, "little")
+             + zlib.crc32(payload).to_bytes(4, "little") + payload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
     try:
-        # generate
-        seq1, seq2 = input_string_generator(input_file)
-
-        # measure time and memory
-
-        # before
-        if _HAS_PSUTIL:
-            m0 = psutil.Process(os.getpid()).memory_info().rss / 1024.0
-        else:
-            m0 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
-
-        t0 = time.time()
-
-        cost, aligned_seq1, aligned_seq2 = align_sequences(seq1, seq2)
-
-        # after
-        if _HAS_PSUTIL:
-            m1 = psutil.Process(os.getpid()).memory_info().rss / 1024.0
-        else:
-            m1 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
-        t1 = time.time()
-
-        elapsed_time = (t1 - t0) * 1000.0
-        mem_used = max(0.0, m1 - m0)
-
-        # output
-        with open(output_file, "w") as f:
-            f.write(str(int(cost)) + "\n")
-            f.write(aligned_seq1 + "\n")
-            f.write(aligned_seq2 + "\n")
-            f.write(str(elapsed_time) + "\n")
-            f.write(str(mem_used))
-        
-    except Exception:
-        sys.exit(1)
+        view = memoryview(frame)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+# Tiled engine: side of a tile (a multiple of 4, so that tiles own whole
+# bytes of the packed direction rows), and rows of a tile whose directions
+# are computed together.
+TILE_SIZE = 1024
+TILE_CHUNK = 32
+
+
+def align_sequences_tiled(seq1, seq2, tile=TILE_SIZE, threads=None,
+                          model=DEFAULT_MODEL):
+    # Tiled wavefront fill of the full table. The cells (i, j), 1 <= i <= m,
+    # 1 <= j <= n, are cut into tile x tile blocks at multiples of tile. A
+    # block only needs the last row of the block above and the last column
+    # of the block to its left, so all blocks of one anti-diagonal of
+    # blocks are independent and run on a thread pool, each filled row by
+    # row with numpy (see _fill_tile). Blocks pass on only their boundary
+    # row and column; the directions go into one packed table, where
+    # concurrent blocks write disjoint rows, and the traceback is the one
+    # of align_sequences.
+    m, n = len(seq1), len(seq2)
+    delta = model.gap
+
+    if tile < 4 or tile % 4:
+        raise ValueError("tile size must be a positive multiple of 4")
+    if m == 0 or n == 0:
+        return align_sequences(seq1, seq2, model)
+
+    count_cells(m * n)
+
+    a = model.encode(seq1)
+    profile = model.query_profile_array(model.encode_array(seq2))
+
+    # backtracking table (0 diag, 1 up, 2 left), packed 2 bits per cell
+    bt = np.zeros((m + 1, packed_row_size(n)), dtype=np.uint8)
+    bt[0] = pack_row_array(np.full(n + 1, LEFT, dtype=np.uint8))
+
+    row_starts = list(range(0, m + 1, tile))
+    col_starts = list(range(0, n + 1, tile))
+
+    # last row of the latest block of every block column (from its left
+    # neighbour's last column on), and last column of the latest block of
+    # every block row; row 0 and column 0 to start with
+    bottoms = [np.arange(max(0, c - 1), min(c + tile, n + 1), dtype=np.int64) * delta
+               for c in col_starts]
+    rights = [np.arange(max(1, r), min(r + tile, m + 1), dtype=np.int64) * delta
+              for r in row_starts]
+
+    def fill(bi, bj):
+        r0, r1 = max(1, row_starts[bi]), min(row_starts[bi] + tile, m + 1)
+        p0 = col_starts[bj]
+        c0, c1 = max(1, p0), min(p0 + tile, n + 1)
+        bottoms[bj], rights[bi] = _fill_tile(
+            a, r0, r1, profile, c0, c1, p0, bottoms[bj], rights[bi], bt, delta)
+
+    with ThreadPoolExecutor(max_workers=threads or os.cpu_count()) as pool:
+        for d in range(len(row_starts) + len(col_starts) - 1):
+            blocks = [(bi, d - bi) for bi in range(len(row_starts))
+                      if 0 <= d - bi < len(col_starts)]
+            # list() waits for the whole anti-diagonal and re-raises errors
+            list(pool.map(lambda block: fill(*block), blocks))
+
+    # backtrack
+    script = traceback_packed(memoryview(bt.reshape(-1)), seq1, seq2)
+
+    return int(bottoms[-1][-1]), script
+
+
+def _fill_tile(a, r0, r1, profile, c0, c1, p0, top, left, bt, delta):
+    # Fills rows r0..r1-1, columns c0..c1-1 of the table from the row above
+    # (columns c0-1..c1-1) and the column to the left (column c0-1), and
+    # packs the directions of columns p0..c1-1 into rows r0..r1-1 of bt.
+    # p0 = c0 & ~3, so the packed range starts on a byte; only column 0
+    # (UP) can lie between p0 and c0. Returns the last row, from column
+    # c0-1 on, and the last column.
+    #
+    # Rows are kept as u[k] = dp[k] - k*delta, which turns the left move
+    # into a plain running minimum, so a row takes four ufunc calls. The
+    # directions are computed afterwards for TILE_CHUNK rows at a time.
+    h, w = r1 - r0, c1 - c0
+    ramp = np.arange(w + 1, dtype=np.int64) * delta
+    # diagonal step in the u domain: substitution cost minus one gap
+    costs = profile[:, c0 - 1:c1 - 1] - delta
+    symbols = np.frombuffer(a, dtype=np.uint8)
+
+    # directions of one chunk of rows, packed into bt chunk by chunk
+    width = c1 - p0
+    dirs = np.zeros((TILE_CHUNK, width + -width % 4), dtype=np.uint8)
+    dirs[:, :c0 - p0] = UP
+
+    u = np.empty((TILE_CHUNK + 1, w + 1), dtype=np.int64)
+    np.subtract(top, ramp, out=u[0])
+    right = np.empty(h, dtype=np.int64)
+    diag = np.empty(w, dtype=np.int64)
+    up = np.empty(w, dtype=np.int64)
+
+    for s in range(0, h, TILE_CHUNK):
+        e = min(s + TILE_CHUNK, h)
+        for r in range(e - s):
+            prev, curr = u[r], u[r + 1]
+            curr[0] = left[s + r]
+            np.add(prev[:-1], costs[a[r0 + s + r - 1]], out=diag)
+            np.add(prev[1:], delta, out=up)
+            np.minimum(diag, up, out=curr[1:])
+            np.minimum.accumulate(curr, out=curr)
+
+        # deterministic tie-breaking: diag, up, left; the shift by k*delta
+        # is the same on both sides of every comparison
+        k = e - s
+        cell = u[1:k + 1, 1:]
+        from_diag = u[:k, :-1] + costs[symbols[r0 + s - 1:r0 + e - 1]]
+        from_up = u[:k, 1:] + delta
+        d = dirs[:k, c0 - p0:c1 - p0]
+        d.fill(LEFT)
+        d[from_up == cell] = UP
+        d[from_diag == cell] = DIAG
+        quads = dirs[:k].reshape(k, -1, 4)
+        bt[r0 + s:r0 + e, p0 // 4:p0 // 4 + quads.shape[1]] = (
+            quads[:, :, 0] | quads[:, :, 1] << 2 | quads[:, :, 2] << 4
+            | quads[:, :, 3] << 6)
+        right[s:e] = u[1:k + 1, w]
+        u[0] = u[k]
+
+    right += w * delta
+    return u[0] + ramp, right
+
+
+# alignment engines selectable with --engine
+ENGINES = {
+    "python": align_sequences,
+    "numpy": align_sequences_numpy,
+    "banded": align_sequences_banded,
+    "four-russians": align_sequences_four_russians,
+    "tiled": align_sequences_tiled,
+}
+
+# engines built on numpy, only offered when it is installed
+NUMPY_ENGINES = ("numpy", "banded", "tiled")
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Basic sequence alignment")
+    parser.add_argument("input_file")
+    parser.add_argument("output_file")
+    parser.add_argument("--engine",
+                        choices=[name for name in sorted(ENGINES)
+                                 if _HAS_NUMPY or name not in NUMPY_ENGINES],
+                        default="tiled" if _HAS_NUMPY else "python",
+                        help="DP engine used to fill the table")
+    parser.add_argument("--block-size", type=int, default=FOUR_RUSSIANS_T,
+                        help="side t of the blocks of the four-russians engine "
+                             "(multiple of 4)")
+    parser.add_argument("--block-cache-dir", default=FOUR_RUSSIANS_CACHE,
+                        help="directory of the four-russians block tables")
+    parser.add_argument("--tile-size", type=int, default=TILE_SIZE,
+                        help="side of the blocks of the tiled engine (multiple of 4)")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="threads of the tiled engine (default: all cores)")
+    cli.add_common_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def align(seq1, seq2, args):
+    # runs the job selected on the command line and returns (cost,
+    # EditScript), None for --score-only; the common prefix and suffix are
+    # peeled off first unless --no-trim
+    if args.no_trim:
+        return solve(seq1, seq2, args)
+    return align_trimmed(lambda a, b: solve(a, b, args), seq1, seq2,
+                         args.scoring, stitch=not args.score_only)
+
+
+def solve(seq1, seq2, args):
+    # the job itself, on the (trimmed) sequences
+    if args.score_only:
+        return score(seq1, seq2, args.scoring), None
+    if args.engine == "four-russians":
+        return align_sequences_four_russians(seq1, seq2, t=args.block_size,
+                                             cache_dir=args.block_cache_dir,
+                                             model=args.scoring)
+    if args.engine == "tiled":
+        return align_sequences_tiled(seq1, seq2, tile=args.tile_size,
+                                     threads=args.threads, model=args.scoring)
+    return ENGINES[args.engine](seq1, seq2, model=args.scoring)
+
+
+def job_name(args):
+    # identifies what align() computes, for the result cache; trimming may
+    # pick another optimal alignment, so it is part of the name
+    if args.score_only:
+        return "score"
+    name = "basic:" + args.engine
+    return name if args.no_trim else name + "+trim"
+
+
+def run(input_file, output_file, args):
+    # aligns one input file and writes the five-line output file;
+    # returns (size, cost, time in ms, memory in KB)
+    return cli.run(input_file, output_file, args,
+                   lambda seq1, seq2, out: align(seq1, seq2, args),
+                   job_name(args))
+
+
+def main():
+    cli.main(parse_args, run)
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,132 @@
+"""
+Batch mode: aligns many input files in one process tree.
+
+Instead of starting a fresh interpreter per input file, the jobs run on a
+pool of worker processes that import basic.py / efficient.py once. Every
+job writes its output file in the usual five-line format, and a summary
+CSV with one row per job is written at the end.
+
+Usage:
+    python3 batch.py INPUTS OUTPUT_DIR [--program basic efficient]
+                     [--jobs N] [--summary FILE] [--options="..."]
+                     [--basic-options="..."] [--efficient-options="..."]
+
+INPUTS is a directory (every in*.txt / input*.txt file in it) or a
+manifest file listing one input path per line, relative to the manifest.
+--options go to every selected program, --basic-options and
+--efficient-options only to that one (their --engine choices differ).
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import contextlib
+import csv
+import importlib
+import io
+import os
+import shlex
+import sys
+
+
+PROGRAMS = ("basic", "efficient")
+
+
+def find_inputs(inputs):
+    """
+    Lists the input files of a batch.
+
+    Args:
+        inputs (str): Directory of input files, or a manifest file.
+
+    Returns:
+        list: Paths of the input files, in order.
+    """
+    if os.path.isdir(inputs):
+        names = sorted(f for f in os.listdir(inputs)
+                       if f.startswith("in") and f.endswith(".txt"))
+        return [os.path.join(inputs, f) for f in names]
+
+    base = os.path.dirname(inputs)
+    with open(inputs) as f:
+        lines = [line.strip() for line in f]
+    return [os.path.join(base, line) for line in lines
+            if line and not line.startswith("#")]
+
+
+def run_job(program, input_path, output_path, options):
+    # runs one input file through basic.py or efficient.py in this worker
+    module = importlib.import_module(program)
+    args = module.parse_args([input_path, output_path] + options)
+    try:
+        size, cost, time_ms, mem_kb = module.run(input_path, output_path, args)
+    except Exception as e:
+        return [input_path, program, "", "", "", "", f"error: {e}"]
+    return [input_path, program, size, cost, time_ms, mem_kb, "ok"]
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Align many input files")
+    parser.add_argument("inputs", help="directory of input files or manifest file")
+    parser.add_argument("output_dir")
+    parser.add_argument("--program", nargs="+", choices=PROGRAMS,
+                        default=list(PROGRAMS), help="solvers to run on every input")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(),
+                        help="worker processes")
+    parser.add_argument("--summary", default=None,
+                        help="summary CSV (default OUTPUT_DIR/summary.csv)")
+    parser.add_argument("--options", default="",
+                        help="extra options passed to every selected solver, "
+                             "e.g. --options=\"--output-format gzip\"")
+    for program in PROGRAMS:
+        parser.add_argument(f"--{program}-options", default="",
+                            help=f"extra options passed to {program}.py only, "
+                                 f"after --options")
+    args = parser.parse_args(argv)
+
+    # reject bad solver options here rather than in every worker
+    args.solver_options = {}
+    for program in args.program:
+        options = (shlex.split(args.options)
+                   + shlex.split(getattr(args, f"{program}_options")))
+        error = io.StringIO()
+        try:
+            with contextlib.redirect_stderr(error):
+                importlib.import_module(program).parse_args(["in", "out"] + options)
+        except SystemExit:
+            message = error.getvalue().strip().splitlines()[-1]
+            parser.error(f"options for {program}.py: {message.split(': error: ')[-1]}")
+        args.solver_options[program] = options
+    return args
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    summary = args.summary or os.path.join(args.output_dir, "summary.csv")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    jobs = []
+    for input_path in find_inputs(args.inputs):
+        name = os.path.basename(input_path)
+        for program in args.program:
+            output_path = os.path.join(args.output_dir, f"{program}_{name}")
+            jobs.append((program, input_path, output_path,
+                         args.solver_options[program]))
+
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        rows = list(pool.map(run_job, *zip(*jobs))) if jobs else []
+
+    with open(summary, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["input", "program", "size", "cost", "time_ms",
+                         "mem_kb", "status"])
+        writer.writerows(rows)
+
+    failed = sum(1 for row in rows if row[-1] != "ok")
+    print(f"{len(rows) - failed}/{len(rows)} jobs ok, summary in {summary}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
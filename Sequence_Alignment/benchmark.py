@@ -0,0 +1,294 @@
+"""
+Benchmark suite for the alignment engines.
+
+Generates reproducible DNA pairs of several kinds and sizes, runs every
+engine on them for a number of trials, and records the median and spread
+of the time plus the peak of python allocations (one extra traced trial,
+since tracemalloc slows the code down). Results can be saved as a baseline
+and later runs compared against it: the suite exits with status 1 when a
+median time or peak memory regresses past the given tolerance, or when
+engines disagree on the optimal cost. The anchored engine only takes part
+in that check when its result is certified optimal.
+
+Pair kinds:
+    similar     a random sequence and a copy with ~5% random edits
+    random      two independent random sequences
+    repetitive  two sequences expanded from short random bases the way
+                input files are (see utils.SequenceRecipe)
+
+Usage:
+    python3 benchmark.py [--sizes 100 1000 10000 100000] [--kinds ...]
+                         [--engines ...] [--repeat 5] [--max-cells N]
+                         [--output FILE] [--save-baseline FILE]
+                         [--baseline FILE] [--time-tolerance 0.25]
+                         [--memory-tolerance 0.10]
+"""
+
+import argparse
+import functools
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import basic
+import efficient
+from utils import ALPHABET, SequenceRecipe
+
+
+KINDS = ("similar", "random", "repetitive")
+
+# pure-python engines are only run up to this many cells
+PYTHON_MAX_CELLS = 4 * 10**6
+
+
+def _four_russians(seq1, seq2, scratch):
+    # private block table, so runs don't depend on the user's cache
+    return basic.align_sequences_four_russians(seq1, seq2, cache_dir=scratch)
+
+
+def _score(seq1, seq2):
+    return efficient.score(seq1, seq2), None
+
+
+def _anchored(seq1, seq2):
+    # a third element says whether the cost is certified optimal
+    stats = {}
+    cost, script = efficient.anchored_align(seq1, seq2, stats=stats)
+    return cost, script, stats["certified"]
+
+
+# name: (function, cell limit, uncapped on similar pairs)
+ENGINES = {
+    "basic:python": (basic.align_sequences, PYTHON_MAX_CELLS, False),
+    "basic:numpy": (basic.align_sequences_numpy, None, False),
+    "basic:banded": (basic.align_sequences_banded, None, True),
+    "basic:four-russians": (_four_russians, PYTHON_MAX_CELLS, False),
+    "basic:tiled": (basic.align_sequences_tiled, None, False),
+    "efficient:hirschberg": (efficient.hirschberg, None, False),
+    # on all cores; the peak only covers the parent process
+    "efficient:hirschberg_parallel": (efficient.hirschberg_parallel, None, False),
+    "efficient:anchored": (_anchored, None, False),
+    "efficient:checkpoint": (efficient.checkpoint_align, None, False),
+    "efficient:score": (_score, None, False),
+}
+
+# like basic.py --engine, the numpy-based engines need numpy
+if not basic._HAS_NUMPY:
+    for name in basic.NUMPY_ENGINES:
+        del ENGINES["basic:" + name]
+
+# engines keeping state on disk, given an empty directory per measurement
+SCRATCH_ENGINES = {"basic:four-russians"}
+
+
+def random_sequence(rng, n):
+    """Returns n random symbols of ALPHABET."""
+    return "".join(rng.choice(ALPHABET) for _ in range(n))
+
+
+def mutate(rng, seq, rate):
+    """Applies random substitutions, insertions and deletions at rate."""
+    out = []
+    for c in seq:
+        r = rng.random()
+        if r < rate / 3:
+            out.append(rng.choice(ALPHABET))
+        elif r < 2 * rate / 3:
+            out.append(c)
+            out.append(rng.choice(ALPHABET))
+        elif r >= rate:
+            out.append(c)
+    return "".join(out)
+
+
+def repetitive_sequence(rng, n):
+    """Expands a short random base by doubling steps to about n symbols."""
+    steps = 0
+    while n >> (steps + 1) >= 4:
+        steps += 1
+    base = random_sequence(rng, max(1, round(n / 2**steps)))
+    indexes = []
+    length = len(base)
+    for _ in range(steps):
+        indexes.append(rng.randrange(length))
+        length *= 2
+    return SequenceRecipe(base, indexes).materialize()
+
+
+def generate_pair(kind, size, seed=0):
+    """
+    Generates a reproducible pair of total length about size.
+
+    Args:
+        kind (str): One of KINDS.
+        size (int): Target m + n.
+        seed (int): Seed, so different pairs of one kind and size can be made.
+
+    Returns:
+        tuple: The two sequences.
+    """
+    rng = random.Random(f"{kind}:{size}:{seed}")
+    half = size // 2
+
+    if kind == "similar":
+        seq1 = random_sequence(rng, half)
+        return seq1, mutate(rng, seq1, 0.05)
+    if kind == "random":
+        return random_sequence(rng, half), random_sequence(rng, half)
+    if kind == "repetitive":
+        return repetitive_sequence(rng, half), repetitive_sequence(rng, half)
+    raise ValueError(f"Unknown pair kind {kind}")
+
+
+def measure(fn, seq1, seq2, repeat):
+    # one warm-up run, repeat timed runs and one traced run for the peak
+    result = fn(seq1, seq2)
+    cost = result[0]
+    certified = result[2] if len(result) > 2 else True
+
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(seq1, seq2)
+        times.append((time.perf_counter() - t0) * 1000.0)
+
+    tracemalloc.start()
+    fn(seq1, seq2)
+    peak = tracemalloc.get_traced_memory()[1] / 1024.0
+    tracemalloc.stop()
+
+    times.sort()
+    if len(times) > 1:
+        q1, _, q3 = statistics.quantiles(times, n=4)
+    else:
+        q1 = q3 = times[0]
+    return {
+        "cost": int(cost),
+        "certified": certified,
+        "time_ms": {
+            "median": statistics.median(times),
+            "q1": q1,
+            "q3": q3,
+            "min": times[0],
+            "max": times[-1],
+        },
+        "peak_kb": peak,
+    }
+
+
+def run_suite(sizes, kinds, engines, repeat, max_cells):
+    """
+    Runs every engine on every generated pair.
+
+    Returns:
+        tuple: (results keyed "engine|kind|size", list of problems found)
+    """
+    results = {}
+    problems = []
+
+    for kind in kinds:
+        for size in sizes:
+            seq1, seq2 = generate_pair(kind, size)
+            cells = len(seq1) * len(seq2)
+            costs = {}
+
+            for name in engines:
+                fn, limit, similar_ok = ENGINES[name]
+                limit = min(l for l in (limit, max_cells) if l is not None)
+                if cells > limit and not (similar_ok and kind == "similar"):
+                    continue
+
+                key = f"{name}|{kind}|{size}"
+                with tempfile.TemporaryDirectory(prefix="benchmark_") as scratch:
+                    if name in SCRATCH_ENGINES:
+                        fn = functools.partial(fn, scratch=scratch)
+                    results[key] = measure(fn, seq1, seq2, repeat)
+                if results[key]["certified"]:
+                    costs[name] = results[key]["cost"]
+
+                t = results[key]["time_ms"]
+                print(f"{key:48} {t['median']:10.2f} ms "
+                      f"[{t['q1']:.2f}, {t['q3']:.2f}] "
+                      f"{results[key]['peak_kb']:10.1f} KB", flush=True)
+
+            if len(set(costs.values())) > 1:
+                problems.append(f"{kind}|{size}: engines disagree on the cost {costs}")
+
+    return results, problems
+
+
+def compare(results, baseline, time_tolerance, memory_tolerance, memory_slack_kb):
+    """Lists the regressions of results against a baseline."""
+    problems = []
+    for key, base in baseline.items():
+        if key not in results:
+            continue
+        cur = results[key]
+
+        limit = base["time_ms"]["median"] * (1 + time_tolerance)
+        if cur["time_ms"]["median"] > limit:
+            problems.append(f"{key}: median time {cur['time_ms']['median']:.2f} ms "
+                            f"> {limit:.2f} ms (baseline {base['time_ms']['median']:.2f} ms)")
+
+        limit = base["peak_kb"] * (1 + memory_tolerance) + memory_slack_kb
+        if cur["peak_kb"] > limit:
+            problems.append(f"{key}: peak memory {cur['peak_kb']:.1f} KB "
+                            f"> {limit:.1f} KB (baseline {base['peak_kb']:.1f} KB)")
+    return problems
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Benchmark the alignment engines")
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[100, 1000, 10000, 100000],
+                        help="total lengths m+n of the generated pairs")
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=list(KINDS))
+    parser.add_argument("--engines", nargs="+", choices=sorted(ENGINES),
+                        default=sorted(ENGINES))
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="timed trials per engine and pair")
+    parser.add_argument("--max-cells", type=float, default=1e8,
+                        help="skip engines on pairs with more cells (m*n); banded "
+                             "still runs on similar pairs")
+    parser.add_argument("--output", default=None, help="write the results as JSON")
+    parser.add_argument("--save-baseline", default=None,
+                        help="store the results as the new baseline")
+    parser.add_argument("--baseline", default=None, help="baseline to compare against")
+    parser.add_argument("--time-tolerance", type=float, default=0.25,
+                        help="allowed relative increase of the median time")
+    parser.add_argument("--memory-tolerance", type=float, default=0.10,
+                        help="allowed relative increase of the peak memory")
+    parser.add_argument("--memory-slack-kb", type=float, default=64,
+                        help="allowed absolute increase of the peak memory")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+
+    results, problems = run_suite(args.sizes, args.kinds, args.engines,
+                                  args.repeat, args.max_cells)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        problems += compare(results, baseline, args.time_tolerance,
+                            args.memory_tolerance, args.memory_slack_kb)
+
+    for problem in problems:
+        print("REGRESSION: " + problem)
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
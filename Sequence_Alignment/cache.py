@@ -0,0 +1,130 @@
+"""
+On-disk cache of alignment results.
+
+Results are stored as the cost and the edit script in its string form
+("3M1X2D"). Entries are content addressed: the key is a hash of the expanded sequences,
+the scoring parameters and the engine that produced the result. Each entry
+is one file, written to a temporary name and renamed into place, so readers
+in other processes only ever see complete entries. A hit refreshes the
+file's mtime, and when the cache grows past its size limit the least
+recently used entries are deleted.
+"""
+
+from editscript import EditScript
+import hashlib
+import os
+
+# check if fcntl available to serialize eviction between processes
+try:
+    import fcntl
+    _HAS_FCNTL = True
+except ImportError:
+    _HAS_FCNTL = False
+
+
+# bump when any engine changes the alignment it returns
+CACHE_VERSION = 2
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache",
+                         "csci570_alignment", "results")
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+
+def cache_key(seq1, seq2, engine, model):
+    """
+    Builds the cache key of one alignment job.
+
+    Args:
+        seq1 (str): First expanded sequence.
+        seq2 (str): Second expanded sequence.
+        engine (str): Name of the engine (and mode) producing the result.
+        model (ScoringModel): Scoring model of the job.
+
+    Returns:
+        str: Hex digest identifying the job.
+    """
+    h = hashlib.sha256()
+    h.update(repr((CACHE_VERSION, engine, model.key())).encode())
+    h.update(b"\0" + seq1.encode() + b"\0" + seq2.encode())
+    return h.hexdigest()
+
+
+def load(key, cache_dir=CACHE_DIR):
+    """
+    Looks up a cached result.
+
+    Args:
+        key (str): Key from cache_key().
+        cache_dir (str): Cache directory.
+
+    Returns:
+        tuple: (cost, EditScript), or None on a miss. The script is None for
+            cost-only results.
+    """
+    path = os.path.join(cache_dir, key + ".txt")
+    try:
+        with open(path) as f:
+            cost, script = f.read().split("\n")
+        script = EditScript.from_cigar(script) if script else None
+        os.utime(path)  # mark as recently used
+    except (OSError, ValueError):
+        return None
+    return int(cost), script
+
+
+def store(key, result, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+    """
+    Adds a result to the cache and evicts old entries past max_bytes.
+
+    Args:
+        key (str): Key from cache_key().
+        result (tuple): (cost, EditScript or None).
+        cache_dir (str): Cache directory.
+        max_bytes (int): Size limit of all entries together.
+    """
+    cost, script = result
+    os.makedirs(cache_dir, exist_ok=True)
+
+    path = os.path.join(cache_dir, key + ".txt")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(f"{int(cost)}\n{script if script is not None else ''}")
+    os.replace(tmp, path)
+
+    _evict(cache_dir, max_bytes)
+
+
+def _evict(cache_dir, max_bytes):
+    # only one process evicts at a time; the others skip it
+    lock = open(os.path.join(cache_dir, ".lock"), "w")
+    try:
+        if _HAS_FCNTL:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return
+
+        entries = []
+        total = 0
+        for entry in os.scandir(cache_dir):
+            if not entry.name.endswith(".txt"):
+                continue
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, entry.path))
+            total += st.st_size
+
+        # least recently used first
+        entries.sort()
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+    finally:
+        lock.close()
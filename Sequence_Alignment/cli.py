@@ -0,0 +1,167 @@
+"""
+Command-line flow shared by basic.py and efficient.py.
+
+Both scripts add their own engine options to the parser and hand run() a
+function that aligns two sequences; parsing the input, the time and memory
+measurement, the result cache, the output file and the JSON report are
+done here the same way for both.
+"""
+
+import json
+import os
+import sys
+import time
+
+from utils import (read_input_file, SequenceRecipe, DEFAULT_MODEL,
+                   scoring_model_arg)
+from instrument import phase
+from writer import AlignmentWriter, FORMATS
+import cache
+import instrument
+
+# check if psutil installed for memory measurement
+try:
+    import psutil
+    _HAS_PSUTIL = True
+except:
+    _HAS_PSUTIL = False
+    import resource
+
+
+def add_common_arguments(parser):
+    """
+    Adds the options both scripts share to an argparse parser.
+
+    Args:
+        parser (argparse.ArgumentParser): Parser of basic.py or efficient.py.
+    """
+    parser.add_argument("--scoring", type=scoring_model_arg, default=DEFAULT_MODEL,
+                        metavar="FILE",
+                        help="JSON scoring model with alphabet, matrix and gap cost")
+    parser.add_argument("--no-trim", action="store_true",
+                        help="don't peel off the common prefix and suffix before aligning")
+    parser.add_argument("--score-only", action="store_true",
+                        help="only compute the optimal cost; alignment lines are left empty")
+    parser.add_argument("--output-format", choices=FORMATS, default="plain",
+                        help="plain text, gzip compressed, or run-length encoded "
+                             "alignment lines")
+    parser.add_argument("--json", action="store_true",
+                        help="write a per-phase JSON report to OUTPUT_FILE.json")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="include the tracemalloc peak in the JSON report (slower)")
+    parser.add_argument("--cache", action="store_true",
+                        help="reuse results from the on-disk result cache")
+    parser.add_argument("--cache-dir", default=cache.CACHE_DIR,
+                        help="directory of the result cache")
+    parser.add_argument("--cache-max-mb", type=float,
+                        default=cache.CACHE_MAX_BYTES / (1024 * 1024),
+                        help="size limit of the result cache")
+
+
+def memory_kb():
+    """Returns the memory of this process in KB, as the output file reports it."""
+    if _HAS_PSUTIL:
+        return psutil.Process(os.getpid()).memory_info().rss / 1024.0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run(input_file, output_file, args, align, job_name, streams=False):
+    """
+    Aligns one input file and writes the five-line output file.
+
+    Args:
+        input_file (str): Input file.
+        output_file (str): Output file.
+        args (argparse.Namespace): Parsed options, including the ones of
+            add_common_arguments().
+        align (callable): align(seq1, seq2, out) returning (cost,
+            EditScript), with None for the script when there is none to
+            write; out is the AlignmentWriter if streams, else None.
+        job_name (str): Names the job for the result cache and the report.
+        streams (bool): Whether align writes the alignment to out itself.
+
+    Returns:
+        tuple: (size, cost, time in ms, memory in KB)
+    """
+    if args.json:
+        instrument.start(trace_memory=args.trace_memory)
+
+    # generate
+    with phase("parse"):
+        s, t, list1, list2 = read_input_file(input_file)
+    with phase("expand"):
+        seq1 = SequenceRecipe(s, list1).materialize()
+        seq2 = SequenceRecipe(t, list2).materialize()
+
+    # streaming engines hand their alignment to the writer as they go
+    writer = AlignmentWriter(output_file, args.output_format)
+    try:
+        # measure time and memory
+        m0 = memory_kb()
+        t0 = time.time()
+
+        result = None
+        if args.cache:
+            with phase("cache"):
+                key = cache.cache_key(seq1, seq2, job_name, args.scoring)
+                result = cache.load(key, args.cache_dir)
+
+        if result is None:
+            with phase("dp_fill"):
+                result = align(seq1, seq2, writer if streams else None)
+            if args.cache:
+                with phase("cache"):
+                    cache.store(key, result, args.cache_dir,
+                                int(args.cache_max_mb * 1024 * 1024))
+
+        cost, script = result
+
+        m1 = memory_kb()
+        t1 = time.time()
+
+        # segments streamed during the alignment are not part of its time,
+        # so every engine's time line measures the same work
+        elapsed_time = (t1 - t0 - writer.seconds) * 1000.0
+        mem_used = max(0.0, m1 - m0)
+
+        # output: the alignment lines are only made from the script here
+        with phase("write"):
+            if script is not None:
+                writer.write_script(script, seq1, seq2)
+            writer.close(cost, elapsed_time, mem_used)
+    except BaseException:
+        writer.abort()
+        raise
+
+    if args.json:
+        # machine-readable sidecar next to the output file
+        report = instrument.stop()
+        report.update({
+            "input": input_file,
+            "job": job_name,
+            "m": len(seq1),
+            "n": len(seq2),
+            "cost": int(cost),
+            "time_ms": elapsed_time,
+            "mem_kb": mem_used,
+        })
+        with open(output_file + ".json", "w") as f:
+            json.dump(report, f, indent=2)
+
+    return len(seq1) + len(seq2), int(cost), elapsed_time, mem_used
+
+
+def main(parse_args, run):
+    """
+    Entry point of a script: parses sys.argv and runs the job.
+
+    Args:
+        parse_args (callable): The script's parse_args(argv).
+        run (callable): The script's run(input_file, output_file, args).
+    """
+    args = parse_args(sys.argv[1:])
+
+    try:
+        run(args.input_file, args.output_file, args)
+    except Exception:
+        sys.exit(1)
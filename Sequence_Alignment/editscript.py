@@ -0,0 +1,190 @@
+"""
+Run-length edit scripts, the alignment representation of all engines.
+
+An alignment of seq1 against seq2 is a list of runs of four operations, in
+the CIGAR style ("3M1X2D5M"):
+
+    M  symbols of both sequences aligned, and equal
+    X  symbols of both sequences aligned, and different
+    D  symbols of seq1 against gaps (deleted from seq1)
+    I  symbols of seq2 against gaps (inserted into seq1)
+
+Adjacent runs of one operation are always merged, so a script takes memory
+in the number of runs, not in the alignment length, and joining two scripts
+only touches their boundary. The two '_'-padded alignment lines are made
+from the sequences only when the output is written (render(), or
+AlignmentWriter.write_script()).
+"""
+
+from array import array
+import re
+
+
+MATCH, MISMATCH, DELETE, INSERT = b"MXDI"
+
+_CIGAR_TOKEN = re.compile(r"(\d+)([MXDI])")
+
+
+class EditScript:
+    """
+    Alignment as runs of M/X/D/I operations.
+
+    Ops are stored as their ASCII codes (MATCH, MISMATCH, DELETE, INSERT)
+    in a bytearray, the run lengths in a parallel array.
+    """
+
+    def __init__(self):
+        self.ops = bytearray()
+        self.counts = array("q")
+
+    def append(self, op, count=1):
+        """Appends count operations op, merging with the last run."""
+        if count <= 0:
+            return
+        if self.ops and self.ops[-1] == op:
+            self.counts[-1] += count
+        else:
+            self.ops.append(op)
+            self.counts.append(count)
+
+    def extend(self, other):
+        """Appends all runs of other, merging the runs that meet."""
+        if not other.ops:
+            return
+        start = 0
+        if self.ops and self.ops[-1] == other.ops[0]:
+            self.counts[-1] += other.counts[0]
+            start = 1
+        self.ops += other.ops[start:]
+        self.counts.extend(other.counts[start:])
+
+    def reverse(self):
+        """Reverses the script in place, for tracebacks built back to front."""
+        self.ops.reverse()
+        self.counts.reverse()
+
+    def mark(self):
+        """Returns a position for since(), the end of the script so far."""
+        return len(self.ops), self.counts[-1] if self.ops else 0
+
+    def since(self, mark):
+        """Returns a new script of everything appended after mark()."""
+        runs, last = mark
+        tail = EditScript()
+        if runs:
+            tail.append(self.ops[runs-1], self.counts[runs-1] - last)
+        tail.extend(self._slice(runs))
+        return tail
+
+    def _slice(self, start):
+        part = EditScript()
+        part.ops = self.ops[start:]
+        part.counts = self.counts[start:]
+        return part
+
+    def runs(self):
+        """Yields (op, count), op as a one-letter string."""
+        for op, count in zip(self.ops, self.counts):
+            yield chr(op), count
+
+    def __len__(self):
+        # number of runs, which is what the script's memory scales with
+        return len(self.ops)
+
+    def __eq__(self, other):
+        return (isinstance(other, EditScript) and self.ops == other.ops
+                and self.counts == other.counts)
+
+    def __str__(self):
+        return "".join(f"{count}{chr(op)}"
+                       for op, count in zip(self.ops, self.counts))
+
+    def __repr__(self):
+        return f"EditScript({str(self)!r})"
+
+    @property
+    def nbytes(self):
+        """Approximate memory of the runs."""
+        return len(self.ops) * (1 + self.counts.itemsize)
+
+    def consumed(self):
+        """Returns how many symbols of seq1 and of seq2 the script covers."""
+        i = j = 0
+        for op, count in zip(self.ops, self.counts):
+            if op != INSERT:
+                i += count
+            if op != DELETE:
+                j += count
+        return i, j
+
+    def render(self, seq1, seq2, i=0, j=0):
+        """
+        Builds the two alignment lines.
+
+        Args:
+            seq1 (str): First sequence.
+            seq2 (str): Second sequence.
+            i (int): Position in seq1 where the script starts.
+            j (int): Position in seq2 where the script starts.
+
+        Returns:
+            tuple: The two aligned strings, with '_' for gaps.
+        """
+        line1 = []
+        line2 = []
+        for op, count in zip(self.ops, self.counts):
+            seg1, seg2, i, j = _segments(op, count, seq1, seq2, i, j)
+            line1.append(seg1)
+            line2.append(seg2)
+        return "".join(line1), "".join(line2)
+
+    def segments(self, seq1, seq2, i=0, j=0):
+        """Like render(), but yields the segments of one run at a time."""
+        for op, count in zip(self.ops, self.counts):
+            seg1, seg2, i, j = _segments(op, count, seq1, seq2, i, j)
+            yield seg1, seg2
+
+    @classmethod
+    def matches(cls, count):
+        """Script of count matching symbols."""
+        script = cls()
+        script.append(MATCH, count)
+        return script
+
+    @classmethod
+    def from_cigar(cls, text):
+        """Parses the string form, e.g. "3M1X2D"."""
+        script = cls()
+        pos = 0
+        for token in _CIGAR_TOKEN.finditer(text):
+            if token.start() != pos:
+                break
+            script.append(ord(token.group(2)), int(token.group(1)))
+            pos = token.end()
+        if pos != len(text):
+            raise ValueError(f"Not an edit script: {text[:40]!r}")
+        return script
+
+    @classmethod
+    def from_alignment(cls, aligned_seq1, aligned_seq2):
+        """Builds the script of two '_'-padded alignment lines."""
+        if len(aligned_seq1) != len(aligned_seq2):
+            raise ValueError("Alignment lines differ in length")
+        script = cls()
+        for a, b in zip(aligned_seq1, aligned_seq2):
+            if a == "_":
+                script.append(INSERT)
+            elif b == "_":
+                script.append(DELETE)
+            else:
+                script.append(MATCH if a == b else MISMATCH)
+        return script
+
+
+def _segments(op, count, seq1, seq2, i, j):
+    # the characters of one run and the positions after it
+    if op == INSERT:
+        return "_" * count, seq2[j:j+count], i, j + count
+    if op == DELETE:
+        return seq1[i:i+count], "_" * count, i + count, j
+    return seq1[i:i+count], seq2[j:j+count], i + count, j + count
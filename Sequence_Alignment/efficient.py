@@ -5,242 +5,1042 @@ That gives us the optimal split point in sequence Y / sequence 2.
 Then we recursively solve the 2 subproblems.
 """
 
-from utils import input_string_generator, alpha
-import os
+from utils import (DEFAULT_MODEL, match_length, align_trimmed,
+                   DIAG, UP, LEFT,
+                   packed_row_size, pack_row, pack_row_array,
+                   traceback_packed)
+from editscript import EditScript, MATCH, MISMATCH, DELETE, INSERT
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from instrument import phase, count_cells
+import cli
+import instrument
+import argparse
+import bisect
+import heapq
 import sys
-import time
 
 
-# check if psutil installed for memory measurement
+# check if numpy installed for the vectorized row kernel
 try:
-    import psutil
-    _HAS_PSUTIL = True
-except:
-    _HAS_PSUTIL = False
-    import resource
+    import numpy as np
+    _HAS_NUMPY = True
+except ImportError:
+    _HAS_NUMPY = False
 
 
-delta = 30  # Gap penalty
+# Full-table kernels: fill rows xs+1..xe of the table of x against
+# y[:ncols] with gap cost delta, starting from the given row xs, and return
+# the last row with the packed 2-bit directions (0 diag, 1 up, 2 left) of
+# every filled row. Row 0 of the direction table is left unset.
+def fill_block_python(xc, xs, xe, profile, ncols, first, delta):
+    count_cells((xe-xs) * ncols)
+    stride = packed_row_size(ncols)
+    bt = bytearray(stride * (xe-xs+1))
 
+    prev = list(first[:ncols+1])
 
-# full dp for small base cases i.e len=1
-def basic_dp(x, y):
-    m, n = len(x), len(y)
-
-    dp = [[0] * (n+1) for _ in range(m+1)]
-    bt = [[-1] * (n+1) for _ in range(m+1)]
-
-    for i in range(m+1):
-        dp[i][0] = i*delta
-        if i>0:
-            bt[i][0] = 1
+    for r, i in enumerate(range(xs, xe), 1):
+        costs = profile[xc[i]]
+        curr = [0]*(ncols+1)
+        dirs = [0]*(ncols+1)
+        curr[0] = prev[0] + delta
+        dirs[0] = UP
 
-    for j in range(n+1):
-        dp[0][j] = j*delta
-        if j>0:
-            bt[0][j] = 2
-
-    for i in range(1, m+1):
-        for j in range(1, n+1):
-            diag = dp[i-1][j-1] + alpha(x[i-1], y[j-1])
-            up = dp[i-1][j] + delta
-            left = dp[i][j-1] + delta
+        for j in range(1, ncols+1):
+            diag = prev[j-1] + costs[j-1]
+            up = prev[j] + delta
+            left = curr[j-1] + delta
 
             best = diag
-            bt_dir = 0
+            bt_dir = DIAG
             if up<best: 
                 best = up
-                bt_dir = 1
+                bt_dir = UP
             if left<best:
                 best = left
-                bt_dir = 2
+                bt_dir = LEFT
 
-            dp[i][j] = best
-            bt[i][j] = bt_dir
+            curr[j] = best
+            dirs[j] = bt_dir
 
-    # backtrack
-    aligned_x = []
-    aligned_y = []
-    i, j = m, n
+        bt[r*stride:(r+1)*stride] = pack_row(dirs)
+        prev = curr
 
-    while i>0 or j>0:
-        if i>0 and j>0 and bt[i][j]==0:
-            aligned_x.append(x[i-1])
-            aligned_y.append(y[j-1])
-            i-=1
-            j-=1
-        elif i>0 and (j==0 or bt[i][j]==1):
-            aligned_x.append(x[i-1])
-            aligned_y.append('_')
-            i-=1
-        else:
-            aligned_x.append("_")
-            aligned_y.append(y[j-1])
-            j-=1
+    return prev, bt
 
-    aligned_x.reverse()
-    aligned_y.reverse()
 
-    aligned_x = ''.join(aligned_x)
-    aligned_y = ''.join(aligned_y)
-    
-    return (int(dp[m][n]), aligned_x, aligned_y)
+# same as fill_block_python, but each row is filled with the vectorized
+# row update and the directions are recovered by comparing against the row
+def fill_block_numpy(xc, xs, xe, profile, ncols, first, delta):
+    count_cells((xe - xs) * ncols)
+    ramp = np.arange(ncols + 1, dtype=np.int64) * delta
 
+    bt = np.zeros((xe - xs + 1, packed_row_size(ncols)), dtype=np.uint8)
+    dirs = np.empty(ncols + 1, dtype=np.uint8)
 
-# computes only last row of table of dp table
-# returns list of length n+1 containing dp costs
-def dp_last_row(x, y):
-    m = len(x)
-    n = len(y)
-    
-    prev = [j*delta for j in range(n+1)]
+    prev = np.array(first[:ncols+1], dtype=np.int64)
+    curr = np.empty(ncols + 1, dtype=np.int64)
+    diag = np.empty(ncols, dtype=np.int64)
+    up = np.empty(ncols, dtype=np.int64)
 
-    for i in range(1, m+1):
-        curr = [0]*(n+1)
-        curr[0] = i*delta
+    for r, i in enumerate(range(xs, xe), 1):
+        curr[0] = prev[0] + delta
+        np.add(prev[:-1], profile[xc[i], :ncols], out=diag)
+        np.add(prev[1:], delta, out=up)
+        np.minimum(diag, up, out=curr[1:])
 
-        for j in range(1, n+1):
-            diag = prev[j-1] + alpha(x[i-1], y[j-1])
-            up   = prev[j]   + delta
-            left = curr[j-1] + delta
+        curr -= ramp
+        np.minimum.accumulate(curr, out=curr)
+        curr += ramp
 
-            best = diag
-            if up < best:
-                best = up
-            if left < best:
-                best = left
-            curr[j] = best
-        
-        prev = curr
+        # deterministic tie-breaking: diag, up, left
+        dirs.fill(LEFT)
+        dirs[0] = UP
+        dirs[1:][up == curr[1:]] = UP
+        dirs[1:][diag == curr[1:]] = DIAG
+        bt[r] = pack_row_array(dirs)
+
+        prev, curr = curr, prev
+
+    return prev, memoryview(bt.reshape(-1))
+
+
+def fill_block(xc, xs, xe, profile, profile_np, ncols, first, delta):
+    # pick the full-table kernel for this block size
+    if profile_np is not None and ncols >= NUMPY_MIN_COLS:
+        return fill_block_numpy(xc, xs, xe, profile_np, ncols, first, delta)
+    return fill_block_python(xc, xs, xe, profile, ncols, first, delta)
+
+
+# full dp for small base cases i.e len=1
+def basic_dp(x, y, model=DEFAULT_MODEL):
+    m, n = len(x), len(y)
+    delta = model.gap
+
+    profile = model.query_profile(model.encode(y))
+    last, bt = fill_block_python(model.encode(x), 0, m, profile, n,
+                                 [j*delta for j in range(n+1)], delta)
+    script = traceback_packed(bt, x, y)
     
+    return (int(last[n]), script)
+
+
+# same as basic_dp, using the vectorized row kernel
+def basic_dp_numpy(x, y, model=DEFAULT_MODEL):
+    m, n = len(x), len(y)
+    delta = model.gap
+
+    profile = model.query_profile_array(model.encode_array(y))
+    last, bt = fill_block_numpy(model.encode(x), 0, m, profile, n,
+                                np.arange(n + 1, dtype=np.int64) * delta, delta)
+    script = traceback_packed(bt, x, y)
+
+    return (int(last[n]), script)
+
+
+# Row kernels on index ranges. They compute the last row of the DP of
+# x[xs:xe] against y[ys:ye] with gap cost delta, straight from the
+# encoded x and the query profile of the whole y, so no substring is ever
+# copied. With
+# reverse=True both ranges are scanned from their ends and row[j] is the
+# cost of aligning x[xs:xe] with y[ys+j:ye], i.e. the backward pass of
+# Hirschberg without reversing strings or rows. A forward pass can also be
+# resumed from a previously computed row with first=.
+def range_row_python(xc, xs, xe, profile, ys, ye, delta, reverse=False,
+                     first=None):
+    n = ye - ys
+    count_cells((xe-xs) * n)
+
+    if not reverse:
+        prev = [j*delta for j in range(n+1)] if first is None else list(first)
+
+        for i in range(xs, xe):
+            curr = [0]*(n+1)
+            curr[0] = prev[0] + delta
+            costs = profile[xc[i]]
+
+            for j in range(1, n+1):
+                diag = prev[j-1] + costs[ys+j-1]
+                up   = prev[j]   + delta
+                left = curr[j-1] + delta
+
+                best = diag
+                if up < best:
+                    best = up
+                if left < best:
+                    best = left
+                curr[j] = best
+
+            prev = curr
+    else:
+        prev = [(n-j)*delta for j in range(n+1)]
+
+        for i in range(xe-1, xs-1, -1):
+            curr = [0]*(n+1)
+            curr[n] = (xe - i)*delta
+            costs = profile[xc[i]]
+
+            for j in range(n-1, -1, -1):
+                diag  = prev[j+1] + costs[ys+j]
+                up    = prev[j]   + delta
+                right = curr[j+1] + delta
+
+                best = diag
+                if up < best:
+                    best = up
+                if right < best:
+                    best = right
+                curr[j] = best
+
+            prev = curr
+
     return prev
 
 
-def dp_last_row_reverse(x, y):
-    # reverse both strings and compute last row, then reverse the row
-    # so that R[j] corresponds to cost of aligning first part of x with second part of y
-    last_rev = dp_last_row(x[::-1], y[::-1])
+# same as range_row_python, but each row is filled with a handful of numpy
+# operations into two reused row buffers instead of n interpreted iterations
+def range_row_numpy(xc, xs, xe, profile, ys, ye, delta, reverse=False,
+                    first=None):
+    n = ye - ys
+    count_cells((xe - xs) * n)
+    ramp = np.arange(n + 1, dtype=np.int64) * delta
 
-    return last_rev[::-1]
+    if first is not None:
+        prev = np.array(first, dtype=np.int64)
+    else:
+        prev = ramp[::-1].copy() if reverse else ramp.copy()
+    curr = np.empty(n + 1, dtype=np.int64)
+    diag = np.empty(n, dtype=np.int64)
 
+    rows = range(xe-1, xs-1, -1) if reverse else range(xs, xe)
 
-def hirschberg(x, y):
-    m, n = len(x), len(y)
+    for k, i in enumerate(rows, 1):
+        costs = profile[xc[i], ys:ye]
 
-    # BASE CASES
-    # BASE CASES
-    #return int(dp[m][n], aligned_x, aligned_y)
-    # for sequence length 0 and 1
+        if not reverse:
+            # diag and up only depend on the previous row
+            curr[0] = prev[0] + delta
+            np.add(prev[:-1], costs, out=diag)
+            np.add(prev[1:], delta, out=curr[1:])
+            np.minimum(curr[1:], diag, out=curr[1:])
 
-    # RECURSION
-    # splitting into left anf right halves
-    # computing forward and backward dp, and the best split
+            # left: curr[j] = min over k <= j of (curr[k] + (j-k)*delta),
+            # which is a running minimum of curr[k] - k*delta shifted back
+            curr -= ramp
+            np.minimum.accumulate(curr, out=curr)
+            curr += ramp
+        else:
+            curr[n] = k * delta
+            np.add(prev[1:], costs, out=diag)
+            np.add(prev[:-1], delta, out=curr[:-1])
+            np.minimum(curr[:-1], diag, out=curr[:-1])
 
-    # should return cost, aligned_x, aligned_y
+            # right: curr[j] = min over k >= j of (curr[k] + (k-j)*delta),
+            # the same running minimum taken over a reversed view
+            curr += ramp
+            scan = curr[::-1]
+            np.minimum.accumulate(scan, out=scan)
+            curr -= ramp
 
-    # temporary: for now this function just calls basic_dp helper function
-    
-    # return basic_dp(x, y)
-    
-    if m == 0:
-        # align empty x with y: all gaps in x
-        aligned_x = "_" * n
-        aligned_y = y
-        return (n * delta, aligned_x, aligned_y)
-    
-    if n == 0:
-        # align x with empty y: all gaps in y
-        aligned_x = x
-        aligned_y = "_" * m
-        return (m * delta, aligned_x, aligned_y)
-    
-    if m == 1 or n == 1:
-        # use basic DP for small cases
-        return basic_dp(x, y)
+        prev, curr = curr, prev
 
-    # RECURSION: split x in half
-    mid = m // 2
-    
-    # Compute forward DP for first half of x
-    x_first = x[:mid]
-    forward = dp_last_row(x_first, y)
-    
-    # Compute backward DP for second half of x
-    x_second = x[mid:]
-    backward = dp_last_row_reverse(x_second, y)
-    
-    # Find optimal split point in y
+    return prev
+
+
+# rows shorter than this are cheaper to fill in pure python than to pay
+# the fixed per-call overhead of the numpy kernel
+NUMPY_MIN_COLS = 32
+
+
+def range_last_row(xc, xs, xe, profile, profile_np, ys, ye, delta,
+                   reverse=False, first=None):
+    # pick the row kernel for this subproblem size
+    if profile_np is not None and ye - ys >= NUMPY_MIN_COLS:
+        return range_row_numpy(xc, xs, xe, profile_np, ys, ye, delta, reverse,
+                               first)
+    return range_row_python(xc, xs, xe, profile, ys, ye, delta, reverse, first)
+
+
+def _profiles(y, model):
+    # query profiles of y for the python and (if available) numpy kernels
+    profile = model.query_profile(model.encode(y))
+    profile_np = None
+    if _HAS_NUMPY:
+        profile_np = model.query_profile_array(model.encode_array(y))
+    return profile, profile_np
+
+
+def dp_last_row(x, y, model=DEFAULT_MODEL):
+    # last row of the DP of x against y, as a list
+    profile, profile_np = _profiles(y, model)
+    row = range_last_row(model.encode(x), 0, len(x), profile, profile_np,
+                         0, len(y), model.gap)
+    return row if isinstance(row, list) else row.tolist()
+
+
+def dp_last_row_reverse(x, y, model=DEFAULT_MODEL):
+    # R[j] corresponds to cost of aligning x with the second part of y, y[j:]
+    profile, profile_np = _profiles(y, model)
+    row = range_last_row(model.encode(x), 0, len(x), profile, profile_np,
+                         0, len(y), model.gap, reverse=True)
+    return row if isinstance(row, list) else row.tolist()
+
+
+def score(x, y, model=DEFAULT_MODEL):
+    # optimal cost only: one linear-memory forward pass, no traceback
+    profile, profile_np = _profiles(y, model)
+    row = range_last_row(model.encode(x), 0, len(x), profile, profile_np,
+                         0, len(y), model.gap)
+    return int(row[-1])
+
+
+def best_split(forward, backward):
     # We want to minimize forward[j] + backward[j] for j in [0, n]
+    # (first minimum wins, so the split is deterministic)
+    if _HAS_NUMPY and isinstance(forward, np.ndarray):
+        return int(np.argmin(forward + backward))
+
     min_cost = float('inf')
     best_j = 0
-    for j in range(n + 1):
+    for j in range(len(forward)):
         cost = forward[j] + backward[j]
         if cost < min_cost:
             min_cost = cost
             best_j = j
-    
-    # Recursively solve two subproblems
-    y_left = y[:best_j]
-    y_right = y[best_j:]
-    
-    cost_left, aligned_x_left, aligned_y_left = hirschberg(x_first, y_left)
-    cost_right, aligned_x_right, aligned_y_right = hirschberg(x_second, y_right)
-    
-    # Combine results
-    aligned_x = aligned_x_left + aligned_x_right
-    aligned_y = aligned_y_left + aligned_y_right
-    total_cost = cost_left + cost_right
-    
-    return (total_cost, aligned_x, aligned_y)
+    return best_j
 
 
+# subproblems with at most this many cells (m*n) are solved directly with
+# the full-table DP instead of being split further; see --base-case-cells.
+# On the Datapoints inputs 2^16 was within noise of the fastest budget
+# while adding only ~20 KB to the peak of the largest input.
+BASE_CASE_CELLS = 1 << 16
 
-# main() is copy-pasted from basic.py
-# NEEDS TO BE MODIFIED
-def main():
-    
-    if len(sys.argv) != 3:
-        sys.exit(1)
 
-    input_file = sys.argv[1]
-    output_file = sys.argv[2]
+def full_dp(x, y, model=DEFAULT_MODEL):
+    # pick the full-table DP for this subproblem size
+    if _HAS_NUMPY and len(y) >= NUMPY_MIN_COLS:
+        return basic_dp_numpy(x, y, model)
+    return basic_dp(x, y, model)
 
-    try:
-        # generate
-        seq1, seq2 = input_string_generator(input_file)
 
-        # measure time and memory
+class SubproblemMemo:
+    """
+    In-run memo of Hirschberg subproblem results and last rows.
 
-        # before
-        if _HAS_PSUTIL:
-            m0 = psutil.Process(os.getpid()).memory_info().rss / 1024.0
-        else:
-            m0 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    Generated inputs repeat the same substrings many times, so different
+    nodes of the recursion often see identical (x range, y range) pairs.
+    Entries are keyed by a polynomial rolling hash of the contents of both
+    ranges, checked against the stored ranges on every hit, and evicted
+    least recently used first once they take more than max_bytes.
 
-        t0 = time.time()
+    Args:
+        max_bytes (int): Approximate memory cap of all entries.
+    """
 
-        cost, aligned_seq1, aligned_seq2 = hirschberg(seq1, seq2)
+    MOD = (1 << 61) - 1
+    BASE = 131
 
-        # after
-        if _HAS_PSUTIL:
-            m1 = psutil.Process(os.getpid()).memory_info().rss / 1024.0
-        else:
-            m1 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
-        t1 = time.time()
-
-        elapsed_time = (t1 - t0) * 1000.0
-        mem_used = max(0.0, m1 - m0)
-
-        # output
-        with open(output_file, "w") as f:
-            f.write(str(int(cost)) + "\n")
-            f.write(aligned_seq1 + "\n")
-            f.write(aligned_seq2 + "\n")
-            f.write(str(elapsed_time) + "\n")
-            f.write(str(mem_used))
-        
-    except Exception:
-        sys.exit(1)
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.used = 0
+        self.table = OrderedDict()
+        self.stats = {"result_hits": 0, "result_misses": 0,
+                      "row_hits": 0, "row_misses": 0}
+
+    def bind(self, x, y):
+        # entries refer to index ranges of one (x, y) pair
+        self.table.clear()
+        self.used = 0
+        self.xv = memoryview(x.encode())
+        self.yv = memoryview(y.encode())
+        self.xh = self._prefix_hashes(self.xv)
+        self.yh = self._prefix_hashes(self.yv)
+        self.powers = [1] * (max(len(x), len(y)) + 1)
+        for k in range(1, len(self.powers)):
+            self.powers[k] = self.powers[k-1] * self.BASE % self.MOD
+
+    def _prefix_hashes(self, seq):
+        h = [0] * (len(seq) + 1)
+        for k, c in enumerate(seq):
+            h[k+1] = (h[k] * self.BASE + c) % self.MOD
+        return h
+
+    def _hash(self, h, s, e):
+        return (h[e] - h[s] * self.powers[e-s]) % self.MOD
+
+    def _key(self, kind, xs, xe, ys, ye):
+        return (kind, self._hash(self.xh, xs, xe), xe - xs,
+                self._hash(self.yh, ys, ye), ye - ys)
+
+    def get(self, kind, xs, xe, ys, ye):
+        """Returns the value stored for equal contents, or None."""
+        key = self._key(kind, xs, xe, ys, ye)
+        entry = self.table.get(key)
+        hit = (entry is not None
+               and self.xv[xs:xe] == self.xv[entry[0]:entry[1]]
+               and self.yv[ys:ye] == self.yv[entry[2]:entry[3]])
+        counter = "result" if kind == "result" else "row"
+        if not hit:
+            self.stats[counter + "_misses"] += 1
+            return None
+        self.stats[counter + "_hits"] += 1
+        self.table.move_to_end(key)
+        return entry[4]
+
+    def put(self, kind, xs, xe, ys, ye, value, size):
+        """Stores value (about size bytes) for the contents of the ranges."""
+        if size > self.max_bytes:
+            return
+        key = self._key(kind, xs, xe, ys, ye)
+        old = self.table.pop(key, None)
+        if old is not None:
+            self.used -= old[5]
+        self.table[key] = (xs, xe, ys, ye, value, size)
+        self.used += size
+        while self.used > self.max_bytes:
+            self.used -= self.table.popitem(last=False)[1][5]
+
+    def hit_rates(self):
+        """Returns the result and row hit rates."""
+        s = self.stats
+        return (s["result_hits"] / max(1, s["result_hits"] + s["result_misses"]),
+                s["row_hits"] / max(1, s["row_hits"] + s["row_misses"]))
+
+
+def _row_bytes(row):
+    # approximate size of a row from either kernel
+    return row.nbytes if _HAS_NUMPY and isinstance(row, np.ndarray) else 36 * len(row)
+
+
+# edit runs a streaming hirschberg collects before handing them on
+STREAM_CHUNK = 1 << 12
+
+
+def hirschberg(x, y, base_case_cells=BASE_CASE_CELLS, memo=None,
+               model=DEFAULT_MODEL, out=None):
+    # Iterative driver: instead of recursing and joining the halves at
+    # every level, subproblems are kept on an explicit stack (left half on
+    # top, so they are solved in output order) and every base case appends
+    # its edit runs to one EditScript, which merges them at the seams.
+    # Subproblems are (start, end) index ranges into x and y; the row
+    # kernels read them from one encoded copy of x and one profile of y.
+    # With a SubproblemMemo, repeated subproblems and last rows are reused;
+    # a marker left under the children of a split records its result once
+    # both are done. With an AlignmentWriter as out, the script is handed
+    # on to it every STREAM_CHUNK runs instead and None is returned for it.
+    m, n = len(x), len(y)
+    delta = model.gap
+
+    if memo is not None:
+        if out is not None:
+            raise ValueError("hirschberg can't stream its output with a memo")
+        memo.bind(x, y)
+
+    xc = model.encode(x)
+    profile, profile_np = _profiles(y, model)
+
+    script = EditScript()
+    # where the part of the script not yet streamed starts
+    fi = fj = 0
+    total_cost = 0
+
+    stack = [(0, m, 0, n)]
+
+    while stack:
+        if out is not None and len(script) >= STREAM_CHUNK:
+            out.write_script(script, x, y, fi, fj)
+            ci, cj = script.consumed()
+            fi, fj = fi + ci, fj + cj
+            script = EditScript()
+
+        item = stack.pop()
+
+        if len(item) == 6:
+            # both halves of a split are done: remember its result
+            xs, xe, ys, ye, start, cost_before = item
+            part = script.since(start)
+            memo.put("result", xs, xe, ys, ye,
+                     (part, total_cost - cost_before), part.nbytes)
+            continue
+
+        xs, xe, ys, ye = item
+        m, n = xe - xs, ye - ys
+
+        if memo is not None and m > 0 and n > 0:
+            hit = memo.get("result", xs, xe, ys, ye)
+            if hit is not None:
+                script.extend(hit[0])
+                total_cost += hit[1]
+                continue
+
+        if m == 0:
+            # align empty x with y: all gaps in x
+            script.append(INSERT, n)
+            total_cost += n * delta
+            continue
+
+        if n == 0:
+            # align x with empty y: all gaps in y
+            script.append(DELETE, m)
+            total_cost += m * delta
+            continue
+
+        if m == 1 or n == 1 or m * n <= base_case_cells:
+            # use full-table DP for small cases: the table fits the budget
+            cost, part = full_dp(x[xs:xe], y[ys:ye], model)
+            script.extend(part)
+            total_cost += cost
+            if memo is not None:
+                memo.put("result", xs, xe, ys, ye, (part, cost), part.nbytes)
+            continue
+
+        # split x in half
+        mid = xs + m // 2
+
+        # forward DP for first half of x, backward DP for second half
+        forward = backward = None
+        if memo is not None:
+            forward = memo.get("forward", xs, mid, ys, ye)
+            backward = memo.get("backward", mid, xe, ys, ye)
+        if forward is None:
+            forward = range_last_row(xc, xs, mid, profile, profile_np, ys, ye,
+                                     delta)
+            if memo is not None:
+                memo.put("forward", xs, mid, ys, ye, forward, _row_bytes(forward))
+        if backward is None:
+            backward = range_last_row(xc, mid, xe, profile, profile_np, ys, ye,
+                                      delta, reverse=True)
+            if memo is not None:
+                memo.put("backward", mid, xe, ys, ye, backward,
+                         _row_bytes(backward))
+
+        # Find optimal split point in y
+        best_j = ys + best_split(forward, backward)
+
+        if memo is not None:
+            stack.append((xs, xe, ys, ye, script.mark(), total_cost))
+
+        # right half is pushed first so the left half is solved first
+        stack.append((mid, xe, best_j, ye))
+        stack.append((xs, mid, ys, best_j))
+
+    if out is not None:
+        out.write_script(script, x, y, fi, fj)
+        return (total_cost, None)
+
+    return (total_cost, script)
+
+
+def checkpoint_align(x, y, interval=None, model=DEFAULT_MODEL):
+    # Linear-space alternative to Hirschberg. A forward pass keeps every
+    # interval-th row of the table (default ~sqrt(m)) as a checkpoint. The
+    # traceback then walks the blocks between checkpoints from last to
+    # first, refilling each one from its checkpoint with a packed direction
+    # table over only the columns it can still reach. The refilled cells
+    # have the same values as the full table, so the alignment is exactly
+    # the one of basic_dp; memory is O(n*sqrt(m)) and no cell is computed
+    # more than twice.
+    m, n = len(x), len(y)
+    delta = model.gap
+    if interval is None:
+        interval = max(1, int(m ** 0.5))
+
+    xc = model.encode(x)
+    profile, profile_np = _profiles(y, model)
+
+    # forward pass, stopping at the start of the last block
+    row = [j*delta for j in range(n+1)]
+    checkpoints = []
+    for ks in range(0, m, interval):
+        if checkpoints:
+            row = range_last_row(xc, ks - interval, ks, profile, profile_np,
+                                 0, n, delta, first=row)
+        checkpoints.append(row)
+
+    # traceback, built back to front; the open run is kept in op, count
+    script = EditScript()
+    op, count = None, 0
+    i, j = m, n
+    total_cost = None
+
+    for k in range(len(checkpoints) - 1, -1, -1):
+        ks = k * interval
+        last, bt = fill_block(xc, ks, i, profile, profile_np, j,
+                              checkpoints[k], delta)
+        checkpoints[k] = None
+        if total_cost is None:
+            total_cost = int(last[n])
+
+        stride = packed_row_size(j)
+        with phase("traceback"):
+            while i > ks:
+                r = i - ks
+                bt_dir = (bt[r*stride + (j >> 2)] >> ((j & 3) << 1)) & 3
+                if j>0 and bt_dir == DIAG:
+                    step = MATCH if x[i-1] == y[j-1] else MISMATCH
+                    i -= 1
+                    j -= 1
+                elif j==0 or bt_dir == UP:
+                    step = DELETE
+                    i -= 1
+                else:
+                    step = INSERT
+                    j -= 1
+                if step != op:
+                    script.append(op, count)
+                    op, count = step, 0
+                count += 1
+
+    if total_cost is None:
+        # empty x
+        total_cost = n * delta
+
+    # row 0: only gaps in x are left
+    script.append(op, count)
+    script.append(INSERT, j)
+    script.reverse()
+
+    return (total_cost, script)
+
+
+# subproblems smaller than this (m*n cells) are not worth shipping to a
+# worker process and are left whole for the serial solver
+PARALLEL_MIN_CELLS = 1 << 16
+
+
+def hirschberg_parallel(x, y, workers=None, max_depth=4,
+                        min_cells=PARALLEL_MIN_CELLS,
+                        base_case_cells=BASE_CASE_CELLS, model=DEFAULT_MODEL):
+    # Runs the top max_depth levels of the Hirschberg recursion level by
+    # level on a process pool: at each level the forward and backward passes
+    # of every subproblem are scheduled concurrently. The pieces left after
+    # the last level are then solved serially by hirschberg() in the workers
+    # and joined back in order. The splits are the same as in hirschberg(),
+    # so the alignment is identical.
+    pieces = [(x, y)]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for _ in range(max_depth):
+            # schedule both passes of every piece that is worth splitting
+            passes = []
+            for px, py in pieces:
+                m, n = len(px), len(py)
+                if (m < 2 or n < 2 or m * n < min_cells
+                        or m * n <= base_case_cells):
+                    passes.append(None)
+                    continue
+                mid = m // 2
+                passes.append((
+                    pool.submit(dp_last_row, px[:mid], py, model),
+                    pool.submit(dp_last_row_reverse, px[mid:], py, model),
+                ))
+
+            if all(p is None for p in passes):
+                break
+
+            # split each piece at its best column, keeping the order
+            next_pieces = []
+            for (px, py), p in zip(pieces, passes):
+                if p is None:
+                    next_pieces.append((px, py))
+                    continue
+                mid = len(px) // 2
+                best_j = best_split(p[0].result(), p[1].result())
+                next_pieces.append((px[:mid], py[:best_j]))
+                next_pieces.append((px[mid:], py[best_j:]))
+            pieces = next_pieces
+
+        xs, ys = zip(*pieces)
+        results = list(pool.map(hirschberg, xs, ys,
+                                [base_case_cells] * len(pieces),
+                                [None] * len(pieces), [model] * len(pieces)))
+
+    total_cost = sum(r[0] for r in results)
+    script = EditScript()
+    for r in results:
+        script.extend(r[1])
+
+    return (total_cost, script)
+
+
+# Anchored mode: seed length, and how many occurrences in y of one k-mer
+# of x are kept as seeds (the ones nearest the expected diagonal, so
+# repeated k-mers of generated inputs don't flood the chainer)
+ANCHOR_K = 16
+ANCHOR_MAX_HITS = 4
+
+
+def _kmer_hashes(codes, k, size):
+    # hash of every k-mer of an encoded sequence: its base-size number,
+    # wrapping modulo 2^64 when it doesn't fit (a collision can only add
+    # a seed candidate, which is checked, or lower the bound)
+    count = len(codes) - k + 1
+    arr = np.frombuffer(codes, dtype=np.uint8).astype(np.uint64)
+    h = np.zeros(count, dtype=np.uint64)
+    base = np.uint64(size)
+    for t in range(k):
+        h *= base
+        h += arr[t:t+count]
+    return h
+
+
+def find_anchors(xc, yc, k, max_hits=ANCHOR_MAX_HITS, size=4):
+    """
+    Finds exact matches between two encoded sequences from k-mer seeds.
+
+    Every k-th k-mer of x is looked up in an index of all k-mers of y, so
+    any common run of at least 2k-1 symbols is hit. Each seed is extended
+    to a maximal exact match.
+
+    Args:
+        xc (bytes): Encoded first sequence.
+        yc (bytes): Encoded second sequence.
+        k (int): Seed length.
+        max_hits (int): Occurrences in y kept per k-mer of x, nearest to
+            the diagonal of the proportional position.
+        size (int): Alphabet size.
+
+    Returns:
+        tuple: (list of maximal matches (i, j, length), number of seeds,
+        number of common k-mers counted with multiplicity)
+    """
+    m, n = len(xc), len(yc)
+    if m < k or n < k:
+        return [], 0, 0
+
+    if _HAS_NUMPY:
+        xk = _kmer_hashes(xc, k, size)
+        yk = _kmer_hashes(yc, k, size)
+
+        # q-gram count for the lower bound
+        ux, cx = np.unique(xk, return_counts=True)
+        uy, cy = np.unique(yk, return_counts=True)
+        _, ix, iy = np.intersect1d(ux, uy, assume_unique=True, return_indices=True)
+        common = int(np.minimum(cx[ix], cy[iy]).sum())
+
+        # index of y: positions sorted by k-mer, ascending within a k-mer
+        order = np.argsort(yk, kind="stable")
+        keys = yk[order]
+        queries = xk[::k]
+        los = np.searchsorted(keys, queries, side="left").tolist()
+        his = np.searchsorted(keys, queries, side="right").tolist()
+        order = order.tolist()
+        lookups = ((q * k, order[lo:hi]) for q, (lo, hi) in enumerate(zip(los, his))
+                   if lo < hi)
+    else:
+        index = {}
+        for j in range(n - k + 1):
+            index.setdefault(yc[j:j+k], []).append(j)
+        counts = {}
+        for i in range(m - k + 1):
+            kmer = xc[i:i+k]
+            counts[kmer] = counts.get(kmer, 0) + 1
+        common = sum(min(c, len(index.get(kmer, ()))) for kmer, c in counts.items())
+        lookups = ((i, index[xc[i:i+k]]) for i in range(0, m - k + 1, k)
+                   if xc[i:i+k] in index)
+
+    seeds = []
+    for i, positions in lookups:
+        if len(positions) > max_hits:
+            # keep the occurrences nearest the expected column
+            c = bisect.bisect_left(positions, i * n // m)
+            lo = max(0, min(c - max_hits // 2, len(positions) - max_hits))
+            positions = positions[lo:lo+max_hits]
+        for j in positions:
+            if xc[i:i+k] == yc[j:j+k]:
+                seeds.append((j - i, i))
+
+    # extend each seed to a maximal match; seeds inside one are skipped
+    seeds.sort()
+    matches = []
+    covered = None
+    for d, i in seeds:
+        if covered is not None and covered[0] == d and i < covered[1]:
+            continue
+        j = i + d
+        left = match_length(xc, i, yc, j, min(i, j), -1)
+        right = match_length(xc, i, yc, j, min(m - i, n - j), 1)
+        matches.append((i - left, j - left, left + right))
+        covered = (d, i + right)
+
+    return matches, len(seeds), common
+
+
+def chain_anchors(matches):
+    """
+    Picks the co-linear matches with the largest total length.
+
+    Args:
+        matches (list): Exact matches (i, j, length).
+
+    Returns:
+        list: The chain, ordered; each match ends before the next starts
+        in both sequences.
+    """
+    if not matches:
+        return []
+
+    matches = sorted(matches)
+    ends = sorted({j + length for _, j, length in matches})
+    rank = {e: r + 1 for r, e in enumerate(ends)}
+
+    # Fenwick tree over the ends in y: best (score, match) ending at or before
+    tree = [(0, -1)] * (len(ends) + 1)
+
+    def update(r, value):
+        while r < len(tree):
+            if value > tree[r]:
+                tree[r] = value
+            r += r & -r
+
+    def query(r):
+        best = (0, -1)
+        while r > 0:
+            if tree[r] > best:
+                best = tree[r]
+            r -= r & -r
+        return best
+
+    score = [0] * len(matches)
+    parent = [-1] * len(matches)
+    pending = []  # (end in x, match) not yet in the tree
+
+    for a, (i, j, length) in enumerate(matches):
+        # matches that end in x before this one starts can precede it
+        while pending and pending[0][0] <= i:
+            _, b = heapq.heappop(pending)
+            update(rank[matches[b][1] + matches[b][2]], (score[b], b))
+
+        best, b = query(bisect.bisect_right(ends, j))
+        score[a] = best + length
+        parent[a] = b
+        heapq.heappush(pending, (i + length, a))
+
+    a = max(range(len(matches)), key=score.__getitem__)
+    chain = []
+    while a != -1:
+        chain.append(matches[a])
+        a = parent[a]
+    chain.reverse()
+    return chain
+
+
+def alignment_lower_bound(m, n, model, min_edits=0):
+    """
+    Lower bound on the optimal cost of aligning lengths m and n.
+
+    An alignment has at least |m-n| gaps and, by the q-gram lemma, at least
+    min_edits gaps or substitutions; every pair costs at least the cheapest
+    identity, every substitution at least the cheapest mismatch.
+
+    Args:
+        m (int): Length of the first sequence.
+        n (int): Length of the second sequence.
+        model (ScoringModel): Scoring model.
+        min_edits (int): Lower bound on the number of edit operations.
+
+    Returns:
+        int: The bound.
+    """
+    size = len(model.alphabet)
+    same = min(model.matrix[c][c] for c in range(size))
+    other = min((model.matrix[a][b] for a in range(size) for b in range(size)
+                 if a != b), default=same)
+    pair = min(same, other)
+
+    # per unit: a gap beyond the pairs, and a substitution beyond a pair
+    gap_extra = 2 * model.gap - pair
+    sub_extra = 2 * (other - pair)
+    if gap_extra < 0:
+        # two gaps are cheaper than any pair: nothing beats all gaps
+        return (m + n) * model.gap
+
+    d = abs(m - n)
+    extra = max(0, min_edits - d) * min(gap_extra, sub_extra)
+    return ((m + n) * pair + d * gap_extra + extra) // 2
+
+
+def anchored_align(x, y, k=ANCHOR_K, base_case_cells=BASE_CASE_CELLS,
+                   model=DEFAULT_MODEL, stats=None, out=None):
+    # Seed-and-chain alignment for long inputs. Exact matches found from
+    # k-mer seeds are chained into co-linear anchors, the anchors are
+    # aligned symbol by symbol, and only the gaps between them go through
+    # hirschberg. The result is optimal among alignments through the
+    # anchors; it is certified globally optimal when its cost meets
+    # alignment_lower_bound() with the edits implied by the q-gram lemma
+    # (max(m,n) - k + 1 - common k-mers) / k, or when no anchor was used.
+    # With an AlignmentWriter as out, the pieces are written to it in order
+    # and None is returned for the script.
+    m, n = len(x), len(y)
+    xc = model.encode(x)
+    yc = model.encode(y)
+
+    with phase("seed"):
+        matches, seeds, common = find_anchors(xc, yc, k,
+                                              size=len(model.alphabet))
+        chain = chain_anchors(matches)
+
+    script = EditScript()
+    total_cost = 0
+    gap_cells = 0
+    pi = pj = 0
+    diag = [model.matrix[c][c] for c in range(len(model.alphabet))]
+
+    for i, j, length in chain + [(m, n, 0)]:
+        # the gap before the anchor, then the anchor itself
+        cost, part = hirschberg(x[pi:i], y[pj:j], base_case_cells,
+                                model=model, out=out)
+        total_cost += cost
+        gap_cells += (i - pi) * (j - pj)
+        if part is not None:
+            script.extend(part)
+
+        if length:
+            total_cost += sum(diag[c] * xc.count(c, i, i + length)
+                              for c in range(len(diag)) if diag[c])
+            if out is not None:
+                out.write(x[i:i+length], y[j:j+length])
+            else:
+                script.append(MATCH, length)
+        pi, pj = i + length, j + length
+
+    min_edits = 0
+    if m >= k and n >= k:
+        min_edits = -(-(max(m, n) - k + 1 - common) // k)
+    lower = alignment_lower_bound(m, n, model, min_edits)
+
+    if stats is not None:
+        stats.update({
+            "seeds": seeds,
+            "anchors": len(chain),
+            "anchored_symbols": sum(length for _, _, length in chain),
+            "gap_cells": gap_cells,
+            "lower_bound": lower,
+            "certified": not chain or total_cost <= lower,
+        })
+
+    return (total_cost, None if out is not None else script)
+
+
+# linear-space engines selectable with --engine
+ENGINES = {
+    "hirschberg": hirschberg,
+    "checkpoint": checkpoint_align,
+    "anchored": anchored_align,
+}
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Memory-efficient sequence alignment")
+    parser.add_argument("input_file")
+    parser.add_argument("output_file")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="hirschberg",
+                        help="linear-space engine used for the alignment")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes for the parallel mode (1 = serial)")
+    parser.add_argument("--parallel-depth", type=int, default=4,
+                        help="recursion levels split on the process pool")
+    parser.add_argument("--parallel-min-cells", type=int, default=PARALLEL_MIN_CELLS,
+                        help="smallest subproblem (m*n) that is still split in parallel")
+    parser.add_argument("--base-case-cells", type=int, default=BASE_CASE_CELLS,
+                        help="subproblems with at most this many cells (m*n) "
+                             "are solved with the full-table DP")
+    parser.add_argument("--seed-k", type=int, default=ANCHOR_K,
+                        help="seed length of the anchored engine")
+    parser.add_argument("--memo-mb", type=float, default=0,
+                        help="memory cap of the in-run subproblem memo (0 = off)")
+    parser.add_argument("--memo-stats", action="store_true",
+                        help="print the memo hit rates to stderr")
+    cli.add_common_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def align(seq1, seq2, args, out=None):
+    # runs the job selected on the command line and returns (cost,
+    # EditScript); the common prefix and suffix are peeled off first unless
+    # --no-trim. With out, the alignment is streamed to it and the script
+    # is None, as it is for --score-only.
+    if args.no_trim:
+        return solve(seq1, seq2, args, out)
+    return align_trimmed(lambda a, b: solve(a, b, args, out), seq1, seq2,
+                         args.scoring, stitch=not args.score_only, out=out)
+
+
+def streams(args):
+    # whether the selected job produces its alignment front to back, so it
+    # can go to the output file without being built in memory
+    if args.score_only or args.cache:
+        return False
+    if args.engine == "anchored":
+        return True
+    return args.engine == "hirschberg" and args.workers <= 1 and args.memo_mb <= 0
+
+
+def solve(seq1, seq2, args, out=None):
+    # the job itself, on the (trimmed) sequences
+    model = args.scoring
+    if args.score_only:
+        return score(seq1, seq2, model), None
+    if args.engine == "checkpoint":
+        return checkpoint_align(seq1, seq2, model=model)
+    if args.engine == "anchored":
+        stats = {}
+        result = anchored_align(seq1, seq2, k=args.seed_k,
+                                base_case_cells=args.base_case_cells,
+                                model=model, stats=stats, out=out)
+        verdict = ("certified optimal" if stats["certified"] else
+                   "heuristic, at most %d above optimal"
+                   % (result[0] - stats["lower_bound"]))
+        print("anchored: %s (%d anchors covering %d symbols)"
+              % (verdict, stats["anchors"], stats["anchored_symbols"]),
+              file=sys.stderr)
+        instrument.annotate(anchored=stats)
+        return result
+    if args.workers > 1:
+        return hirschberg_parallel(seq1, seq2, workers=args.workers,
+                                   max_depth=args.parallel_depth,
+                                   min_cells=args.parallel_min_cells,
+                                   base_case_cells=args.base_case_cells,
+                                   model=model)
+    memo = None
+    if args.memo_mb > 0:
+        memo = SubproblemMemo(int(args.memo_mb * 1024 * 1024))
+    result = hirschberg(seq1, seq2, base_case_cells=args.base_case_cells,
+                        memo=memo, model=model, out=out)
+    if memo is not None and args.memo_stats:
+        print("memo: %(result_hits)d/%(result_misses)d result hits/misses, "
+              "%(row_hits)d/%(row_misses)d row hits/misses" % memo.stats,
+              file=sys.stderr)
+    return result
+
+
+def job_name(args):
+    # identifies what align() computes, for the result cache; the parallel
+    # mode returns the same alignment as the serial one, trimming may pick
+    # another optimal alignment
+    if args.score_only:
+        return "score"
+    if args.engine == "checkpoint":
+        name = "efficient:checkpoint"
+    elif args.engine == "anchored":
+        name = f"efficient:anchored:{args.seed_k}:{args.base_case_cells}"
+    else:
+        name = f"efficient:hirschberg:{args.base_case_cells}"
+    return name if args.no_trim else name + "+trim"
+
+
+def run(input_file, output_file, args):
+    # aligns one input file and writes the five-line output file;
+    # returns (size, cost, time in ms, memory in KB)
+    return cli.run(input_file, output_file, args,
+                   lambda seq1, seq2, out: align(seq1, seq2, args, out=out),
+                   job_name(args), streams=streams(args))
+
+
+def main():
+    cli.main(parse_args, run)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,122 @@
+"""
+Per-phase instrumentation of an alignment run.
+
+The solvers mark their phases with `with phase("dp_fill"):` and report the
+DP cells they compute with count_cells(). Both are no-ops unless a report
+was started with start(). Phase times are exclusive: while a nested phase
+runs, the enclosing one is paused, so the phases add up to the total.
+"""
+
+from contextlib import contextmanager
+import sys
+import time
+import tracemalloc
+
+# check if resource available for the peak RSS
+try:
+    import resource
+    _HAS_RESOURCE = True
+except ImportError:
+    _HAS_RESOURCE = False
+
+
+_report = None
+
+
+def start(trace_memory=False):
+    """
+    Starts a new report.
+
+    Args:
+        trace_memory (bool): Also track the peak of python allocations with
+            tracemalloc (accurate, but slows pure-python code down).
+    """
+    global _report
+    _report = {
+        "phases_ns": {},
+        "dp_cells": 0,
+        "fields": {},
+        "stack": [],
+        "last": time.perf_counter_ns(),
+        "start": time.perf_counter_ns(),
+        "trace_memory": trace_memory,
+    }
+    if trace_memory:
+        tracemalloc.start()
+
+
+def stop():
+    """
+    Ends the current report.
+
+    Returns:
+        dict: Exclusive time per phase in ns, total time in ns, DP cells
+        computed, peak RSS in KB, (if traced) the tracemalloc peak in KB and
+        any fields added with annotate().
+    """
+    global _report
+    report, _report = _report, None
+
+    now = time.perf_counter_ns()
+    _charge(report, now)
+
+    traced_peak = None
+    if report["trace_memory"]:
+        traced_peak = tracemalloc.get_traced_memory()[1] / 1024.0
+        tracemalloc.stop()
+
+    result = {
+        "phases_ns": report["phases_ns"],
+        "total_ns": now - report["start"],
+        "dp_cells": report["dp_cells"],
+        "peak_rss_kb": peak_rss_kb(),
+        "tracemalloc_peak_kb": traced_peak,
+    }
+    result.update(report["fields"])
+    return result
+
+
+def peak_rss_kb():
+    """Returns the peak resident set size of this process in KB, if known."""
+    if not _HAS_RESOURCE:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KB elsewhere
+    return peak / 1024.0 if sys.platform == "darwin" else float(peak)
+
+
+def _charge(report, now):
+    # adds the time since the last switch to the innermost open phase
+    name = report["stack"][-1] if report["stack"] else "other"
+    phases = report["phases_ns"]
+    phases[name] = phases.get(name, 0) + now - report["last"]
+    report["last"] = now
+
+
+@contextmanager
+def phase(name):
+    """Attributes the time spent in the block to phase name."""
+    report = _report
+    if report is None:
+        yield
+        return
+
+    _charge(report, time.perf_counter_ns())
+    report["stack"].append(name)
+    try:
+        yield
+    finally:
+        _charge(report, time.perf_counter_ns())
+        report["stack"].pop()
+
+
+def count_cells(k):
+    """Adds k to the number of DP cells computed."""
+    if _report is not None:
+        _report["dp_cells"] += k
+
+
+def annotate(**fields):
+    """Adds fields to the current report."""
+    if _report is not None:
+        _report["fields"].update(fields)
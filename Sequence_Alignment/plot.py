@@ -1,55 +1,157 @@
 # collect_datapoints.py
+#
+# Runs basic.py and efficient.py on every Datapoints file, each trial in a
+# fresh interpreter pinned to one CPU. Trials run concurrently (--jobs),
+# after --warmup discarded runs per program and file, and the CSV and plots
+# show the median and interquartile range of --repeat trials, together
+# with the fitted complexity curves.
+#
+# Usage: python3 plot.py [--jobs N] [--repeat N] [--warmup N] [--no-pin]
+from concurrent.futures import ThreadPoolExecutor
+import argparse
 import os
+import queue
+import statistics
 import subprocess
-from utils import input_string_generator
+from utils import input_recipes
 import matplotlib.pyplot as plt
+import numpy as np
 import csv
 
 DATA_DIR = "../CSCI570_Project/Datapoints"
 RESULT_DIR = "../CSCI570_Project/DatapointResults"
 CSV_FILE = "../CSCI570_Project"
-os.makedirs(RESULT_DIR, exist_ok=True)
-
-basic_prog = ["python3", "basic.py"]
-eff_prog   = ["python3", "efficient.py"]
-
-rows = []
+TRIAL_DIR = os.path.join(RESULT_DIR, "trials")
+os.makedirs(TRIAL_DIR, exist_ok=True)
+
+PROGRAMS = {
+    "basic": ["python3", "basic.py"],
+    "efficient": ["python3", "efficient.py"],
+}
+
+# points this far off the fitted curve are reported
+ANOMALY_TOLERANCE = 0.25
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Collect and plot the datapoints")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(),
+                        help="trials running at the same time")
+    parser.add_argument("--repeat", type=int, default=5, help="trials per point")
+    parser.add_argument("--warmup", type=int, default=1,
+                        help="discarded runs per point before the trials")
+    parser.add_argument("--no-pin", action="store_true",
+                        help="don't pin the trials to CPUs")
+    return parser.parse_args()
+
+
+# read last two lines: time, mem
+def read_time_mem(path):
+    with open(path) as f:
+        lines = [line.strip() for line in f.readlines() if line.strip() != ""]
+    time_ms = float(lines[-2])
+    mem_kb  = float(lines[-1])
+    return time_ms, mem_kb
+
+
+def run_trial(cpus, pin, program, input_path, output_path):
+    # every trial is its own process, pinned to a CPU nobody else uses
+    cpu = cpus.get()
+    try:
+        proc = subprocess.Popen(PROGRAMS[program] + [input_path, output_path])
+        # pinned from here rather than with preexec_fn, which is not safe
+        # to use from threads; the child is still starting the interpreter,
+        # before its timed region
+        if pin and hasattr(os, "sched_setaffinity"):
+            try:
+                os.sched_setaffinity(proc.pid, {cpu})
+            except ProcessLookupError:
+                pass
+        if proc.wait() != 0:
+            raise subprocess.CalledProcessError(proc.returncode, proc.args)
+    finally:
+        cpus.put(cpu)
+    return read_time_mem(output_path)
+
+
+def run_trials(trials, jobs, pin):
+    if hasattr(os, "sched_getaffinity"):
+        available = sorted(os.sched_getaffinity(0))
+    else:
+        available = list(range(os.cpu_count() or 1))
+    jobs = max(1, min(jobs, len(available))) if pin else max(1, jobs)
+
+    cpus = queue.Queue()
+    for i in range(jobs):
+        cpus.put(available[i % len(available)])
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(run_trial, cpus, pin, *trial) for trial in trials]
+        return [f.result() for f in futures]
+
+
+def median_iqr(values):
+    if len(values) > 1:
+        q1, _, q3 = statistics.quantiles(values, n=4)
+        return statistics.median(values), q1, q3
+    return values[0], values[0], values[0]
+
+
+def fit(terms, y):
+    # y = sum of a_i*term_i + c, least squares on the relative error so the
+    # small sizes count as much as the large ones
+    y = np.asarray(y, dtype=float)
+    A = np.column_stack([np.asarray(t, dtype=float) for t in terms] + [np.ones(len(y))])
+    w = 1.0 / np.maximum(y, 1e-9)
+    coef = np.linalg.lstsq(A * w[:, None], y * w, rcond=None)[0]
+    return A @ coef
+
+
+args = parse_args()
+
+points = []
 for fname in sorted(os.listdir(DATA_DIR)):
     if not fname.startswith("in") or not fname.endswith(".txt"):
         continue
 
     input_path = os.path.join(DATA_DIR, fname)
 
-    # problem size m+n
-    s1, s2 = input_string_generator(input_path)
-    size = len(s1) + len(s2)
-
+    # problem size m+n, without expanding the sequences
+    s1, s2 = input_recipes(input_path)
     num = fname.replace("input", "").replace(".txt", "")
-    out_basic = os.path.join(RESULT_DIR, f"basic_{num}.txt")
-    out_eff   = os.path.join(RESULT_DIR, f"efficient_{num}.txt")
-
-    # run basic
-    subprocess.run(basic_prog + [input_path, out_basic], check=True)
-    # run efficient
-    subprocess.run(eff_prog + [input_path, out_eff], check=True)
-
-    # read last two lines: time, mem
-    def read_time_mem(path):
-        with open(path) as f:
-            lines = [line.strip() for line in f.readlines() if line.strip() != ""]
-        time_ms = float(lines[-2])
-        mem_kb  = float(lines[-1])
-        return time_ms, mem_kb
+    points.append((input_path, num, len(s1), len(s2)))
+
+warmups = []
+trials = []
+for input_path, num, m, n in points:
+    for program in PROGRAMS:
+        for k in range(args.warmup):
+            warmups.append((program, input_path,
+                            os.path.join(TRIAL_DIR, f"{program}_{num}.warmup{k}.txt")))
+        for k in range(args.repeat):
+            trials.append((program, input_path,
+                           os.path.join(TRIAL_DIR, f"{program}_{num}.{k}.txt")))
+
+run_trials(warmups, args.jobs, not args.no_pin)
+samples = {}
+for (program, input_path, _), result in zip(trials, run_trials(trials, args.jobs, not args.no_pin)):
+    samples.setdefault((program, input_path), []).append(result)
 
-    t_b, m_b = read_time_mem(out_basic)
-    t_e, m_e = read_time_mem(out_eff)
-
-    rows.append((size, t_b, m_b, t_e, m_e))
+rows = []
+for input_path, num, m, n in points:
+    row = [m + n, m * n]
+    for program in PROGRAMS:
+        times, mems = zip(*samples[(program, input_path)])
+        row += median_iqr(times) + median_iqr(mems)
+    rows.append(row)
 
 rows.sort(key=lambda x: x[0])
 
 with open(f"{CSV_FILE}/datapoints_stats.csv", "w") as f:
-    f.write("size,time_basic,mem_basic,time_efficient,mem_efficient\n")
+    f.write("size,cells,"
+            "time_basic,time_basic_q1,time_basic_q3,mem_basic,mem_basic_q1,mem_basic_q3,"
+            "time_efficient,time_efficient_q1,time_efficient_q3,"
+            "mem_efficient,mem_efficient_q1,mem_efficient_q3\n")
     for r in rows:
         f.write(",".join(str(x) for x in r) + "\n")
 
@@ -57,40 +159,57 @@ print("Written datapoints_stats.csv")
 
 
 # Plotting
-sizes = []
-time_basic = []
-time_eff = []
-mem_basic = []
-mem_eff = []
-
+stats = {}
 with open(f"{CSV_FILE}/datapoints_stats.csv") as f:
     reader = csv.DictReader(f)
     for row in reader:
-        sizes.append(int(row["size"]))
-        time_basic.append(float(row["time_basic"]))
-        time_eff.append(float(row["time_efficient"]))
-        mem_basic.append(float(row["mem_basic"]))
-        mem_eff.append(float(row["mem_efficient"]))
+        for key, value in row.items():
+            stats.setdefault(key, []).append(float(value))
+
+sizes = stats["size"]
+cells = stats["cells"]
+
+# time is O(mn) for both; memory is O(mn) for basic and O(m+n) for
+# efficient. The lower order terms cover per-row work and startup.
+fits = {
+    "time_basic": ("O(mn)", [cells, sizes]),
+    "time_efficient": ("O(mn)", [cells, sizes]),
+    "mem_basic": ("O(mn)", [cells, sizes]),
+    "mem_efficient": ("O(m+n)", [sizes]),
+}
+
+
+def plot_metric(metrics, ylabel, title, path):
+    plt.figure()
+    for key, label in metrics:
+        median = np.array(stats[key])
+        yerr = [median - stats[key + "_q1"], np.array(stats[key + "_q3"]) - median]
+        line = plt.errorbar(sizes, median, yerr=yerr, marker="o", capsize=3,
+                            label=f"{label} (median, IQR)")
+
+        name, terms = fits[key]
+        fitted = fit(terms, median)
+        plt.plot(sizes, fitted, linestyle="--", color=line[0].get_color(),
+                 label=f"{label} {name} fit")
+
+        for size, y, y_fit in zip(sizes, median, fitted):
+            if abs(y - y_fit) > ANOMALY_TOLERANCE * abs(y_fit):
+                print(f"{key}: size {int(size)} is {y:.1f}, fit {name} expects {y_fit:.1f}")
+
+    plt.xlabel("Problem size (m + n)")
+    plt.ylabel(ylabel)
+    plt.title(title)
+    plt.legend()
+    plt.grid(True)
+    plt.savefig(path, dpi=200)
+
 
 # 1. CPU time vs problem size
-plt.figure()
-plt.plot(sizes, time_basic, marker="o", label="Basic")
-plt.plot(sizes, time_eff, marker="o", label="Efficient")
-plt.xlabel("Problem size (m + n)")
-plt.ylabel("CPU time (ms)")
-plt.title("CPU time vs Problem size")
-plt.legend()
-plt.grid(True)
-plt.savefig(f"{CSV_FILE}/time_vs_size.png", dpi=200)
+plot_metric([("time_basic", "Basic"), ("time_efficient", "Efficient")],
+            "CPU time (ms)", "CPU time vs Problem size",
+            f"{CSV_FILE}/time_vs_size.png")
 
 # 2. Memory vs problem size
-plt.figure()
-plt.plot(sizes, mem_basic, marker="o", label="Basic")
-plt.plot(sizes, mem_eff, marker="o", label="Efficient")
-plt.xlabel("Problem size (m + n)")
-plt.ylabel("Memory usage (KB)")
-plt.title("Memory usage vs Problem size")
-plt.legend()
-plt.grid(True)
-plt.savefig(f"{CSV_FILE}/memory_vs_size.png", dpi=200)
-
+plot_metric([("mem_basic", "Basic"), ("mem_efficient", "Efficient")],
+            "Memory usage (KB)", "Memory usage vs Problem size",
+            f"{CSV_FILE}/memory_vs_size.png")
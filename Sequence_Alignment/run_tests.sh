@@ -14,10 +14,56 @@ mkdir -p "$RESULTS_DIR/efficient"
 PROGRAM_BASIC="python3 basic.py"
 PROGRAM_EFFICIENT="python3 efficient.py"
 
+# Engines to test; the numpy ones only when numpy is installed
+BASIC_ENGINES="python four-russians"
+if python3 -c "import numpy" 2>/dev/null; then
+    BASIC_ENGINES="$BASIC_ENGINES numpy banded tiled"
+fi
+EFFICIENT_ENGINES="hirschberg checkpoint anchored"
+FORMATS="plain gzip rle"
+
+# outputs of the other engines and formats, and the four-russians block
+# tables, go to a scratch directory
+SCRATCH_DIR=$(mktemp -d)
+trap 'rm -rf "$SCRATCH_DIR"' EXIT
+
+FAILED=0
+
+# the default costs as a --scoring file, which must change nothing
+SCORING_FILE="$SCRATCH_DIR/scoring.json"
+python3 -c "import json, sys, utils; m = utils.DEFAULT_MODEL; json.dump({'alphabet': m.alphabet, 'gap': m.gap, 'matrix': m.matrix}, open(sys.argv[1], 'w'))" "$SCORING_FILE"
+
+# batch mode on all samples at once; its outputs are checked per test below
+python3 batch.py "$TEST_DIR" "$SCRATCH_DIR/batch" --jobs 2 > /dev/null
+
+# prints cost and both alignment lines of an output file of any format
+read_output() {
+    python3 -c "import sys, writer; print(*writer.read_output(sys.argv[1])[:3], sep='\n')" "$1"
+}
+
+# check NAME EXPECTED_FILE ACTUAL_FILE [REFERENCE_FILE [REFERENCE_NAME]]
+# compares the cost with the expected output and, with a reference, the
+# alignment lines with those of the reference (--engine python by default)
+check() {
+    expected_first=$(sed -n '1p' "$2")
+    actual=$(read_output "$3")
+    actual_first=$(echo "$actual" | sed -n '1p')
+
+    if [ "$expected_first" != "$actual_first" ]; then
+        echo
+        echo "  FAIL ❌ $1"
+        echo "    Expected first line: $expected_first"
+        echo "    Actual first line:   $actual_first"
+        FAILED=$((FAILED + 1))
+    elif [ -n "$4" ] && [ "$actual" != "$(read_output "$4")" ]; then
+        echo
+        echo "  FAIL ❌ $1: alignment differs from ${5:---engine python}"
+        FAILED=$((FAILED + 1))
+    fi
+}
+
 echo "===== Running Test Cases ====="
 
-# Basic Tests
-echo "---- Basic Tests ----"
 # Loop through input files
 for input in $TEST_DIR/input*.txt; do
     # Extract the number (e.g., input3 → 3)
@@ -26,55 +72,97 @@ for input in $TEST_DIR/input*.txt; do
     num=${num//.txt/}
 
     expected="$TEST_DIR/output${num}.txt"
-    actual="$RESULTS_DIR/basic/output${num}.txt"
+    reference="$SCRATCH_DIR/basic_output${num}_python.txt"
 
     echo -n "Test $num: "
+    failed_before=$FAILED
 
-     # Run program
+    # Default modes, kept in the results dir
+    actual="$RESULTS_DIR/basic/output${num}.txt"
+    rm -f "$actual"
     $PROGRAM_BASIC "$input" "$actual"
-
-    # extract first line of expected and actual
-    expected_first=$(sed -n '1p' "$expected")
-    actual_first=$(sed -n '1p' "$actual")
-
-    if [ "$expected_first" = "$actual_first" ]; then
-        echo "PASS"
-    else
-        echo "FAIL ❌"
-        echo "  Expected first line: $expected_first"
-        echo "  Actual first line:   $actual_first"
-    fi
-done
-
-
-# Efficient Tests
-echo "---- Efficient Tests ----"
-# Loop through input files
-for input in $TEST_DIR/input*.txt; do
-    # Extract the number (e.g., input3 → 3)
-    base=$(basename "$input")
-    num=${base//input/}
-    num=${num//.txt/}
-
-    expected="$TEST_DIR/output${num}.txt"
+    check "basic" "$expected" "$actual"
     actual="$RESULTS_DIR/efficient/output${num}.txt"
-
-    echo -n "Test $num: "
-
-     # Run program
+    rm -f "$actual"
     $PROGRAM_EFFICIENT "$input" "$actual"
-
-    # extract first line of expected and actual
-    expected_first=$(sed -n '1p' "$expected")
-    actual_first=$(sed -n '1p' "$actual")
-
-    if [ "$expected_first" = "$actual_first" ]; then
+    check "efficient" "$expected" "$actual"
+
+    # Basic: every full-table engine must give the alignment of the python one
+    rm -f "$reference"
+    $PROGRAM_BASIC "$input" "$reference" --engine python
+    check "basic --engine python" "$expected" "$reference"
+    for engine in $BASIC_ENGINES; do
+        for format in $FORMATS; do
+            actual="$SCRATCH_DIR/basic_output${num}_${engine}_${format}.txt"
+            rm -f "$actual"
+            $PROGRAM_BASIC "$input" "$actual" --engine "$engine" \
+                --output-format "$format" --block-cache-dir "$SCRATCH_DIR"
+            check "basic --engine $engine --output-format $format" \
+                "$expected" "$actual" "$reference"
+        done
+    done
+
+    # Efficient: the engines may pick another optimal alignment, so only the
+    # cost is compared
+    for engine in $EFFICIENT_ENGINES; do
+        for format in $FORMATS; do
+            actual="$SCRATCH_DIR/efficient_output${num}_${engine}_${format}.txt"
+            rm -f "$actual"
+            $PROGRAM_EFFICIENT "$input" "$actual" --engine "$engine" \
+                --output-format "$format" 2>/dev/null
+            check "efficient --engine $engine --output-format $format" \
+                "$expected" "$actual"
+        done
+    done
+    actual="$SCRATCH_DIR/efficient_output${num}_parallel.txt"
+    rm -f "$actual"
+    $PROGRAM_EFFICIENT "$input" "$actual" --workers 2
+    check "efficient --workers 2" "$expected" "$actual"
+
+    # Options of both scripts
+    for program in basic efficient; do
+        if [ $program = basic ]; then solver=$PROGRAM_BASIC; else solver=$PROGRAM_EFFICIENT; fi
+        uncached="$RESULTS_DIR/$program/output${num}.txt"
+
+        # result cache: a miss, then a hit, both as the uncached run
+        for run in 1 2; do
+            actual="$SCRATCH_DIR/${program}_output${num}_cache${run}.txt"
+            rm -f "$actual"
+            $solver "$input" "$actual" --cache --cache-dir "$SCRATCH_DIR/cache"
+            check "$program --cache (run $run)" "$expected" "$actual" \
+                "$uncached" "the uncached run"
+        done
+
+        # the same costs given with --scoring
+        actual="$SCRATCH_DIR/${program}_output${num}_scoring.txt"
+        rm -f "$actual"
+        $solver "$input" "$actual" --scoring "$SCORING_FILE"
+        check "$program --scoring" "$expected" "$actual" \
+            "$uncached" "the run without --scoring"
+
+        # no trimming: ties may resolve differently, so only the cost
+        actual="$SCRATCH_DIR/${program}_output${num}_notrim.txt"
+        rm -f "$actual"
+        $solver "$input" "$actual" --no-trim
+        check "$program --no-trim" "$expected" "$actual"
+
+        actual="$SCRATCH_DIR/${program}_output${num}_score.txt"
+        rm -f "$actual"
+        $solver "$input" "$actual" --score-only
+        check "$program --score-only" "$expected" "$actual"
+
+        check "batch.py $program" "$expected" \
+            "$SCRATCH_DIR/batch/${program}_$base" "$uncached" "the $program.py run"
+    done
+
+    if [ $FAILED = $failed_before ]; then
         echo "PASS"
-    else
-        echo "FAIL ❌"
-        echo "  Expected first line: $expected_first"
-        echo "  Actual first line:   $actual_first"
     fi
 done
 
-echo "===== Done ====="
\ No newline at end of file
+if [ $FAILED = 0 ]; then
+    echo "===== Done: all PASS ====="
+else
+    echo "===== Done: $FAILED checks FAILED ====="
+    exit 1
+fi
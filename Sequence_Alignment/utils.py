@@ -1,3 +1,9 @@
+from editscript import EditScript, MATCH, MISMATCH, DELETE, INSERT
+from instrument import phase
+import argparse
+import json
+
+
 def read_input_file(file_path):
     """
     Reads sequences from a text file and returns them as a tuple of strings.
@@ -67,27 +73,498 @@ def input_string_generator(file_path):
     Returns:
         tuple: A tuple containing two sequences (seq1, seq2).
     """
+    s, t = input_recipes(file_path)
+
+    return s.materialize(), t.materialize()
+
+class SequenceRecipe:
+    """
+    Lazy form of a generated sequence: the base string and the insertion
+    indexes, as returned by read_input_file.
+
+    Step k turns s into s[:j+1] + s + s[j+1:], so the length doubles at
+    every step and is known without expanding anything. Characters and
+    ranges are resolved by mapping positions back through the steps.
+
+    Args:
+        base (str): The base string.
+        indexes (list): Insertion indexes, applied in order.
+    """
+
+    def __init__(self, base, indexes):
+        self.base = base
+        self.indexes = list(indexes)
+
+        # lengths[k] is the length after k steps, cuts[k] where step k+1
+        # splits the previous string (python slice semantics)
+        self.lengths = [len(base)]
+        self.cuts = []
+        for j in self.indexes:
+            prev = self.lengths[-1]
+            cut = j + 1
+            if cut < 0:
+                cut = max(0, prev + cut)
+            self.cuts.append(min(cut, prev))
+            self.lengths.append(2 * prev)
+
+    def __len__(self):
+        return self.lengths[-1]
+
+    def __getitem__(self, p):
+        """Returns the character at position p of the generated sequence."""
+        if p < 0:
+            p += len(self)
+        if not 0 <= p < len(self):
+            raise IndexError("recipe index out of range")
+
+        for k in range(len(self.indexes), 0, -1):
+            cut, prev = self.cuts[k-1], self.lengths[k-1]
+            if p >= cut + prev:
+                p -= prev
+            elif p >= cut:
+                p -= cut
+        return self.base[p]
+
+    def chunks(self, size=1 << 16):
+        """Yields the generated sequence in strings of at most size characters."""
+        for a in range(0, len(self), size):
+            b = min(a + size, len(self))
+            buf = bytearray(b - a)
+            self._emit(buf, len(self.indexes), a, b, 0, {})
+            yield buf.decode()
+
+    def materialize(self):
+        """Returns the generated sequence, written once into one buffer."""
+        buf = bytearray(len(self))
+        self._emit(buf, len(self.indexes), 0, len(self), 0, {})
+        return buf.decode()
+
+    def _emit(self, buf, k, a, b, pos, full):
+        # Writes characters [a, b) of the string after k steps into buf at
+        # pos and returns the next position. full[k] remembers where a
+        # complete copy of that string was already written, so later
+        # copies of it are a single slice copy within buf.
+        if a >= b:
+            return pos
+        if k == 0:
+            buf[pos:pos+b-a] = self.base[a:b].encode()
+            return pos + b - a
+
+        whole = a == 0 and b == self.lengths[k]
+        if whole and k in full:
+            src = full[k]
+            buf[pos:pos+b] = buf[src:src+b]
+            return pos + b
+
+        start = pos
+        cut, prev = self.cuts[k-1], self.lengths[k-1]
+
+        # s[:cut], then s, then s[cut:], each clipped to [a, b)
+        for lo, hi, shift in ((0, cut, 0),
+                              (cut, cut + prev, cut),
+                              (cut + prev, 2 * prev, prev)):
+            pos = self._emit(buf, k - 1, max(a, lo) - shift,
+                             min(b, hi) - shift, pos, full)
+
+        if whole:
+            full[k] = start
+        return pos
+
+
+def input_recipes(file_path):
+    """
+    Reads an input file into lazy recipes of its two sequences.
+
+    Args:
+        file_path (str): Path to the input text file.
+
+    Returns:
+        tuple: Two SequenceRecipe objects (seq1, seq2).
+    """
     s, t, list1, list2 = read_input_file(file_path)
+    return SequenceRecipe(s, list1), SequenceRecipe(t, list2)
+
+
+# check if numpy installed for the array forms of the scoring tables
+try:
+    import numpy as np
+    _HAS_NUMPY = True
+except ImportError:
+    _HAS_NUMPY = False
+
+
+# Scoring layer shared by all DP engines. Sequences are encoded once into
+# symbol codes (A=0, C=1, G=2, T=3) so that a mismatch cost is an indexed
+# load instead of a function call per cell.
+ALPHABET = "ACGT"
+
+ALPHA_MATRIX = [[0, 110, 48, 94],
+                [110, 0, 118, 48],
+                [48, 118, 0, 110],
+                [94, 48, 110, 0]
+                ]
+
+DELTA = 30  # Gap penalty
+
+
+class ScoringModel:
+    """
+    A validated and compiled scoring scheme: alphabet, substitution matrix
+    and linear gap cost.
+
+    Everything the DP kernels read per cell is built once here: the
+    bytes.translate() tables that encode a sequence into symbol codes, the
+    matrix as flat tuples and as a numpy array, and from those the query
+    profiles of a sequence. The kernels get the profiles and the gap cost
+    as plain arguments, so no cell pays for a lookup on the model.
+
+    Args:
+        alphabet (str): Distinct printable ASCII symbols, no digits or '_'.
+        matrix (list): len(alphabet) rows of len(alphabet) nonnegative
+            integer costs; matrix[a][b] is the cost of symbol a of the first
+            sequence against symbol b of the second.
+        gap (int): Positive integer cost of a gap.
+
+    Raises:
+        ValueError: If the alphabet, matrix or gap cost is malformed. The
+            banded and Four-Russians engines rely on nonnegative costs.
+    """
+
+    def __init__(self, alphabet, matrix, gap):
+        if not isinstance(alphabet, str) or not alphabet:
+            raise ValueError("alphabet must be a non-empty string")
+        if len(set(alphabet)) != len(alphabet):
+            raise ValueError(f"alphabet {alphabet!r} repeats a symbol")
+        # digits would read as insertion indexes and break rle output
+        if any(not (c.isascii() and c.isprintable()) or c.isspace()
+               or c.isdigit() or c == "_" for c in alphabet):
+            raise ValueError(f"alphabet {alphabet!r} must be printable ASCII "
+                             "without spaces, digits or '_'")
+
+        k = len(alphabet)
+        if len(matrix) != k or any(len(row) != k for row in matrix):
+            raise ValueError(f"matrix must be {k}x{k} for alphabet {alphabet!r}")
+        for row in matrix:
+            for v in row:
+                if not _is_int(v) or v < 0:
+                    raise ValueError(f"matrix costs must be nonnegative integers, got {v!r}")
+        if not _is_int(gap) or gap <= 0:
+            raise ValueError(f"gap cost must be a positive integer, got {gap!r}")
+
+        self.alphabet = alphabet
+        self.matrix = tuple(tuple(int(v) for v in row) for row in matrix)
+        self.gap = int(gap)
+
+        # bytes.translate() table mapping each alphabet byte to its code and
+        # every other byte to 255, which encode() rejects
+        table = bytearray([255]) * 256
+        for code, c in enumerate(alphabet):
+            table[ord(c)] = code
+        self._encode_table = bytes(table)
+        self._codes = bytes(range(k))
+        self._index = {c: code for code, c in enumerate(alphabet)}
+
+        self.matrix_array = np.array(self.matrix, dtype=np.int64) if _HAS_NUMPY else None
+
+        # A common first symbol a can be aligned to itself without losing
+        # optimality when that costs at most two gaps and at most anything
+        # else in its row and column: an optimal alignment that gaps the
+        # first a of one sequence and pairs the other a with some b (or also
+        # gaps it) is turned into one that pairs the two a's and gaps b,
+        # at no extra cost. The same holds for a common last symbol.
+        self.trim_safe = all(
+            self.matrix[a][a] <= 2 * self.gap
+            and self.matrix[a][a] == min(self.matrix[a])
+            and self.matrix[a][a] == min(row[a] for row in self.matrix)
+            for a in range(k))
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Loads a model from a JSON file.
+
+        The file holds an object with the keys "alphabet" (str), "matrix"
+        (list of rows) and "gap" (int).
+
+        Args:
+            path (str): Path to the JSON file.
+
+        Returns:
+            ScoringModel: The validated model.
+
+        Raises:
+            ValueError: If the file is not valid JSON or the model is malformed.
+        """
+        with open(path) as f:
+            try:
+                spec = json.load(f)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}: {e}")
+        try:
+            return cls(spec["alphabet"], spec["matrix"], spec["gap"])
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"{path}: needs \"alphabet\", \"matrix\" and \"gap\" ({e})")
+        except ValueError as e:
+            raise ValueError(f"{path}: {e}")
+
+    def key(self):
+        """Returns a tuple identifying the model, for cache keys."""
+        return (self.alphabet, self.matrix, self.gap)
+
+    def alpha(self, c1, c2):
+        """Returns the value for matching a character."""
+        return self.matrix[self._index[c1]][self._index[c2]]
+
+    def encode(self, seq):
+        """
+        Encodes a sequence into compact symbol codes.
+
+        Args:
+            seq (str): Sequence over the alphabet.
+
+        Returns:
+            bytes: One code (0..len(alphabet)-1) per character of seq.
+        """
+        try:
+            codes = seq.encode("ascii").translate(self._encode_table)
+        except UnicodeEncodeError:
+            codes = b"\xff"
+        if codes.translate(None, self._codes):
+            raise ValueError(f"Sequence contains symbols outside {self.alphabet}")
+        return codes
+
+    def query_profile(self, codes):
+        """
+        Precomputes one cost row per alphabet symbol for an encoded sequence.
+
+        Args:
+            codes (bytes): Encoded sequence, as returned by encode().
+
+        Returns:
+            list: profile[c][j] is the cost of aligning symbol c with codes[j].
+        """
+        return [[row[k] for k in codes] for row in self.matrix]
 
-    for j in list1:
-        temp = s[:j+1] + s + s[j+1:]
-        s = temp
-    for k in list2:
-        temp = t[:k+1] + t + t[k+1:]
-        t = temp
+    def encode_array(self, seq):
+        """Same as encode(), but returns a numpy uint8 array."""
+        return np.frombuffer(self.encode(seq), dtype=np.uint8)
+
+    def query_profile_array(self, codes):
+        """Same as query_profile(), but takes and returns numpy arrays."""
+        return self.matrix_array[:, codes]
+
+
+def _is_int(v):
+    # bools are ints to python, but not costs
+    return isinstance(v, int) and not isinstance(v, bool)
+
+
+def scoring_model_arg(path):
+    """argparse type of the --scoring option: the model loaded from path."""
+    try:
+        return ScoringModel.from_file(path)
+    except (OSError, ValueError) as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+DEFAULT_MODEL = ScoringModel(ALPHABET, ALPHA_MATRIX, DELTA)
 
-    return s, t
 
 def alpha(c1, c2):
     """Returns the value for matching a character."""
-    alpha_matrix = [[0, 110, 48, 94],
-                    [110, 0, 118, 48],
-                    [48, 118, 0, 110],
-                    [94, 48, 110, 0]
-                    ]
-    
-    char_to_index = {'A': 0, 'C': 1, 'G': 2, 'T': 3}
-    return alpha_matrix[char_to_index[c1]][char_to_index[c2]]
+    return DEFAULT_MODEL.alpha(c1, c2)
+
+
+def match_length(a, i, b, j, limit, step=1):
+    """
+    Length of the common run of two sequences from given positions.
+
+    Slices are compared in doubling, then halving chunks, so a long run
+    costs O(log) slice comparisons instead of one per symbol.
+
+    Args:
+        a: First sequence (str or bytes).
+        i (int): Position in a.
+        b: Second sequence, of the same type.
+        j (int): Position in b.
+        limit (int): Longest run to report.
+        step (int): 1 to compare a[i:] with b[j:], -1 for a[:i] with b[:j]
+            backwards.
+
+    Returns:
+        int: The run length, at most limit.
+    """
+    def equal(n):
+        if step > 0:
+            return a[i:i+n] == b[j:j+n]
+        return a[i-n:i] == b[j-n:j]
+
+    n = 1
+    while n <= limit and equal(n):
+        n *= 2
+    lo, hi = n // 2, min(n - 1, limit)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if equal(mid):
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def common_affixes(seq1, seq2, model=DEFAULT_MODEL):
+    """
+    Lengths of the common prefix and suffix that can be aligned symbol by
+    symbol without changing the optimal cost.
+
+    Args:
+        seq1 (str): First sequence.
+        seq2 (str): Second sequence.
+        model (ScoringModel): Scoring model; nothing is trimmed unless its
+            trim_safe holds.
+
+    Returns:
+        tuple: (prefix, suffix) lengths; they don't overlap.
+    """
+    if not model.trim_safe:
+        return 0, 0
+    limit = min(len(seq1), len(seq2))
+    prefix = match_length(seq1, 0, seq2, 0, limit)
+    suffix = match_length(seq1, len(seq1), seq2, len(seq2), limit - prefix, -1)
+    return prefix, suffix
+
+
+def align_trimmed(align_fn, seq1, seq2, model=DEFAULT_MODEL, stitch=True,
+                  out=None):
+    """
+    Runs an alignment on the sequences without their common prefix and
+    suffix, then stitches those back on.
+
+    Args:
+        align_fn: Function of the two trimmed sequences returning (cost,
+            EditScript), with None for no script.
+        seq1 (str): First sequence.
+        seq2 (str): Second sequence.
+        model (ScoringModel): Scoring model of align_fn.
+        stitch (bool): False for cost-only jobs, which return no script.
+        out (AlignmentWriter): If given, align_fn streams its alignment to
+            it; the prefix is written before and the suffix after it.
+
+    Returns:
+        tuple: (cost, EditScript) of the whole sequences; the script is None
+            for cost-only and streamed jobs.
+    """
+    with phase("trim"):
+        prefix, suffix = common_affixes(seq1, seq2, model)
+        head = seq1[:prefix]
+        tail = seq1[len(seq1) - suffix:]
+        # encode() also rejects bad symbols in the trimmed parts
+        diag = [model.matrix[c][c] for c in range(len(model.alphabet))]
+        cost = sum(diag[c] for c in model.encode(head + tail))
+
+    if prefix == 0 and suffix == 0:
+        return align_fn(seq1, seq2)
+
+    if out is not None:
+        out.write(head, head)
+    mid_cost, mid = align_fn(seq1[prefix:len(seq1) - suffix],
+                             seq2[prefix:len(seq2) - suffix])
+    if out is not None:
+        out.write(tail, tail)
+
+    if not stitch or mid is None:
+        return cost + mid_cost, None
+    script = EditScript.matches(prefix)
+    script.extend(mid)
+    script.append(MATCH, suffix)
+    return cost + mid_cost, script
+
+# Backtracking directions of the full-table engines. They are stored as
+# 2-bit codes, four cells per byte, in rows of packed_row_size(n) bytes.
+DIAG, UP, LEFT = 0, 1, 2
+
+
+def packed_row_size(n):
+    """Bytes needed for one packed row of n+1 direction codes."""
+    return (n + 4) // 4
+
+
+def pack_row(dirs):
+    """
+    Packs a row of direction codes, four per byte.
+
+    Args:
+        dirs (list): n+1 direction codes (DIAG, UP or LEFT).
+
+    Returns:
+        bytes: packed_row_size(n) bytes, cell j in bits 2*(j%4) of byte j//4.
+    """
+    dirs = dirs + [0] * (-len(dirs) % 4)
+    return bytes(a | b << 2 | c << 4 | d << 6
+                 for a, b, c, d in zip(dirs[0::4], dirs[1::4],
+                                       dirs[2::4], dirs[3::4]))
+
+
+def pack_row_array(dirs):
+    """Same as pack_row(), but takes and returns numpy uint8 arrays."""
+    padded = np.zeros(packed_row_size(len(dirs) - 1) * 4, dtype=np.uint8)
+    padded[:len(dirs)] = dirs
+    quads = padded.reshape(-1, 4)
+    return quads[:, 0] | quads[:, 1] << 2 | quads[:, 2] << 4 | quads[:, 3] << 6
+
+
+def traceback_packed(bt, seq1, seq2, band_lo=None, band_width=None):
+    """
+    Walks a packed backtracking table from (m, n) back to (0, 0).
+
+    Args:
+        bt: Flat buffer of (m+1) rows of packed_row_size(n) bytes each
+            (bytearray, or a memoryview of a numpy array).
+        seq1 (str): Sequence along the rows.
+        seq2 (str): Sequence along the columns.
+        band_lo (int): For banded tables, the lowest stored j - i. Row i
+            then holds band_width cells, cell j at position j - i - band_lo.
+        band_width (int): Cells per row of a banded table.
+
+    Returns:
+        EditScript: The alignment.
+    """
+    if band_lo is None:
+        stride = packed_row_size(len(seq2))
+        band_lo = 0
+        banded = 0
+    else:
+        stride = packed_row_size(band_width - 1)
+        banded = 1
+
+    # built back to front; the open run is kept in op, count
+    script = EditScript()
+    op, count = None, 0
+    i, j = len(seq1), len(seq2)
+
+    with phase("traceback"):
+        while i>0 or j>0:
+            t = j - banded*i - band_lo
+            bt_dir = (bt[i*stride + (t >> 2)] >> ((t & 3) << 1)) & 3
+            if i>0 and j>0 and bt_dir == DIAG:
+                step = MATCH if seq1[i-1] == seq2[j-1] else MISMATCH
+                i -= 1
+                j -= 1
+            elif i>0 and (j==0 or bt_dir == UP):
+                step = DELETE
+                i -= 1
+            else:
+                step = INSERT
+                j -= 1
+            if step != op:
+                script.append(op, count)
+                op, count = step, 0
+            count += 1
+
+    script.append(op, count)
+    script.reverse()
+
+    return script
 
 # Add a main function to test the utility
 if __name__ == "__main__":
@@ -0,0 +1,186 @@
+"""
+Streaming writer of the five-line output file.
+
+Edit scripts are rendered here run by run (write_script()), and engines
+that produce the alignment front to back pass it in segments as they go,
+so the two aligned strings are never built in memory. Segments are
+buffered and appended to two spill files next to the output (one per
+alignment line, since both lines grow at the same time). close() then
+writes the cost, copies the spills into place and adds the time and memory
+lines; the file is renamed into place, so readers never see a partial one.
+
+Output formats:
+    plain  the usual five-line text file
+    gzip   the same five lines, gzip compressed
+    rle    alignment lines run-length encoded: every run of one symbol is
+           written as its length and the symbol, the length left out when
+           it is 1 ("AAAC__G" becomes "3AC2_G"); symbols are never digits
+"""
+
+import gzip
+import os
+import re
+import shutil
+import time
+
+
+FORMATS = ("plain", "gzip", "rle")
+
+# segments are collected until they hold this many characters per line
+BUFFER_CHARS = 1 << 16
+
+_RUN = re.compile(r"(.)\1*", re.S)
+_RLE_TOKEN = re.compile(r"(\d*)(\D)")
+
+
+class AlignmentWriter:
+    """
+    Writes an output file from alignment segments given in order.
+
+    Args:
+        path (str): Output file.
+        fmt (str): One of FORMATS.
+        buffer_chars (int): Characters per line buffered before a spill.
+
+    Attributes:
+        seconds (float): Time spent in write_script() so far, which streaming
+            callers leave out of their own measurements.
+    """
+
+    def __init__(self, path, fmt="plain", buffer_chars=BUFFER_CHARS):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown output format {fmt}")
+        self.path = path
+        self.fmt = fmt
+        self.buffer_chars = buffer_chars
+
+        self._tmp = f"{path}.{os.getpid()}"
+        self._spills = [open(f"{self._tmp}.{k}.tmp", "w") for k in (1, 2)]
+        self._buffers = ([], [])
+        self._buffered = 0
+        # run still open at the end of each line, for rle
+        self._runs = [["", 0], ["", 0]]
+        self.seconds = 0.0
+
+    def write(self, seg1, seg2):
+        """
+        Appends a segment of both alignment lines.
+
+        Args:
+            seg1 (str): Next characters of the first aligned sequence.
+            seg2 (str): Next characters of the second aligned sequence.
+        """
+        self._buffers[0].append(seg1)
+        self._buffers[1].append(seg2)
+        self._buffered += max(len(seg1), len(seg2))
+        if self._buffered >= self.buffer_chars:
+            self._flush()
+
+    def write_script(self, script, seq1, seq2, i=0, j=0):
+        """
+        Appends the alignment lines of an EditScript.
+
+        Args:
+            script (EditScript): Alignment to write.
+            seq1 (str): First sequence.
+            seq2 (str): Second sequence.
+            i (int): Position in seq1 where the script starts.
+            j (int): Position in seq2 where the script starts.
+        """
+        t0 = time.perf_counter()
+        for seg1, seg2 in script.segments(seq1, seq2, i, j):
+            self.write(seg1, seg2)
+        self.seconds += time.perf_counter() - t0
+
+    def _flush(self):
+        for k in (0, 1):
+            text = "".join(self._buffers[k])
+            self._buffers[k].clear()
+            if self.fmt == "rle":
+                text = self._encode_runs(text, self._runs[k])
+            self._spills[k].write(text)
+        self._buffered = 0
+
+    @staticmethod
+    def _encode_runs(text, run):
+        # encodes every run of text but the last, which may go on in the
+        # next segment and is kept in run as [symbol, length]
+        out = []
+        for match in _RUN.finditer(text):
+            c, n = match.group(1), match.end() - match.start()
+            if c == run[0]:
+                run[1] += n
+                continue
+            if run[1]:
+                out.append(_rle_run(*run))
+            run[0], run[1] = c, n
+        return "".join(out)
+
+    def close(self, cost, time_ms, mem_kb):
+        """
+        Writes the output file.
+
+        Args:
+            cost (int): Alignment cost.
+            time_ms (float): Time line.
+            mem_kb (float): Memory line.
+        """
+        self._flush()
+        for k in (0, 1):
+            if self.fmt == "rle" and self._runs[k][1]:
+                self._spills[k].write(_rle_run(*self._runs[k]))
+            self._spills[k].close()
+
+        tmp = self._tmp + ".tmp"
+        if self.fmt == "gzip":
+            f = gzip.open(tmp, "wt")
+        else:
+            f = open(tmp, "w")
+        with f:
+            f.write(str(int(cost)) + "\n")
+            for k in (0, 1):
+                with open(self._spills[k].name) as spill:
+                    shutil.copyfileobj(spill, f)
+                f.write("\n")
+            f.write(str(time_ms) + "\n")
+            f.write(str(mem_kb))
+        os.replace(tmp, self.path)
+        self._remove_spills()
+
+    def abort(self):
+        """Drops everything written so far."""
+        for spill in self._spills:
+            spill.close()
+        self._remove_spills()
+
+    def _remove_spills(self):
+        for spill in self._spills:
+            try:
+                os.remove(spill.name)
+            except FileNotFoundError:
+                pass
+
+
+def _rle_run(c, n):
+    return c if n == 1 else f"{n}{c}"
+
+
+def rle_decode(line):
+    """Expands a run-length encoded alignment line."""
+    return "".join(c * int(n or 1) for n, c in _RLE_TOKEN.findall(line))
+
+
+def read_output(path):
+    """
+    Reads an output file of any format.
+
+    Returns:
+        tuple: (cost, aligned_seq1, aligned_seq2, time_ms, mem_kb)
+    """
+    with open(path, "rb") as f:
+        compressed = f.read(2) == b"\x1f\x8b"
+    with (gzip.open(path, "rt") if compressed else open(path)) as f:
+        cost, line1, line2, time_ms, mem_kb = f.read().split("\n")
+    if any(ch.isdigit() for ch in line1 + line2):
+        line1, line2 = rle_decode(line1), rle_decode(line2)
+    return int(cost), line1, line2, float(time_ms), float(mem_kb)